@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['tkinter', 'tkinter.ttk', 'tkinter.messagebox', 'tkinter.simpledialog', 'bs4', 'lxml', 'deepl', 'xlsxwriter', 'requests', 'pathlib'],
+    hiddenimports=['tkinter', 'tkinter.ttk', 'tkinter.messagebox', 'tkinter.simpledialog', 'lxml', 'deepl', 'xlsxwriter', 'requests', 'pathlib'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -8,15 +8,22 @@ from config import load_config, save_api_key
 _CACHED_DEEPL_KEY = None
 
 
-def prompt_deepl_key_gui():
-    """Prompt user for API key via GUI and save it"""
+def prompt_deepl_key_gui(parent=None):
+    """Prompt user for API key via GUI and save it
+
+    parent is the app's window when it is already running; otherwise a
+    hidden window is created for the dialog.
+    """
     try:
         import tkinter as tk
         from tkinter import simpledialog
-        root = tk.Tk()
-        root.withdraw()
-        key = simpledialog.askstring("DeepL API Key", "Enter your DeepL API key:", show='*')
-        root.destroy()
+        if parent is None:
+            root = tk.Tk()
+            root.withdraw()
+            key = simpledialog.askstring("DeepL API Key", "Enter your DeepL API key:", show='*')
+            root.destroy()
+        else:
+            key = simpledialog.askstring("DeepL API Key", "Enter your DeepL API key:", show='*', parent=parent)
         key = (key or "").strip()
         
         # Save key to config file if provided
@@ -39,8 +46,8 @@ def prompt_deepl_key_gui():
             return key
 
 
-def load_deepl_key():
-    """Load API key from environment variable, config file, or prompt user"""
+def find_deepl_key():
+    """Find API key in environment variable or config file, without prompting"""
     # Check environment variable first
     env = os.getenv('DEEPL_API_KEY')
     if env:
@@ -51,15 +58,24 @@ def load_deepl_key():
     if config.get('deepl_api_key'):
         return config['deepl_api_key'].strip()
     
+    return None
+
+
+def load_deepl_key(parent=None):
+    """Load API key from environment variable, config file, or prompt user"""
+    key = find_deepl_key()
+    if key:
+        return key
+    
     # If not found, prompt user
-    return prompt_deepl_key_gui()
+    return prompt_deepl_key_gui(parent)
 
 
-def get_deepl_key():
+def get_deepl_key(parent=None):
     """Get the DeepL API key (cached)"""
     global _CACHED_DEEPL_KEY
     if _CACHED_DEEPL_KEY is None:
-        _CACHED_DEEPL_KEY = load_deepl_key()
+        _CACHED_DEEPL_KEY = load_deepl_key(parent)
     return _CACHED_DEEPL_KEY
 
 
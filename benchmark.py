@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark against a local fake website and a fake DeepL server
+
+Usage:
+    python benchmark.py [--pages 500] [--sitemaps 5] [--languages DE,FR] [--output results.json]
+
+Starts a local HTTP server generating a synthetic site (sitemap index,
+child sitemaps, pages with a realistic mix of headings, paragraphs and
+list items plus shared navigation/footer boilerplate) and a stand-in for
+the DeepL API with configurable latency and rate limit. Then runs
+get_all_urls, create_content_only_doc and create_translation_doc end to
+end and reports pages/sec, segments/sec, API calls, peak RSS and wall
+time. Results are printed and saved as JSON so runs can be compared.
+
+Everything runs in a temporary home directory, so the real config,
+translation cache and run state are never touched.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+WORDS = (
+    "translation website content page service product customer team support quality "
+    "design global market solution experience platform data secure fast simple modern "
+    "business growth local language partner project future value trusted results"
+).split()
+
+BOILERPLATE = [
+    ("Home", False), ("About us", False), ("Services", False), ("Contact", False),
+    ("Subscribe to our newsletter", True),
+    ("We use cookies to improve your experience on our website.", False),
+    ("© Example Company. All rights reserved.", False),
+]
+
+
+def make_sentence(rng, low, high):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(low, high))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_page(seed, number, segments):
+    """Build the HTML of one synthetic page and the number of segments it has"""
+    rng = random.Random(seed * 100003 + number)
+    title = make_sentence(rng, 3, 7)
+    nav = "<nav><ul>" + "".join(f"<li>{text}</li>" for text, _ in BOILERPLATE[:4]) + "</ul></nav>"
+
+    parts = [f"<h1>{title}</h1>"]
+    count = 1
+    while count < segments - len(BOILERPLATE):
+        kind = rng.random()
+        if kind < 0.15:
+            level = rng.randint(2, 4)
+            parts.append(f"<h{level}>{make_sentence(rng, 2, 6)}</h{level}>")
+            count += 1
+        elif kind < 0.35:
+            items = rng.randint(2, 5)
+            parts.append("<ul>" + "".join(f"<li>{make_sentence(rng, 3, 10)}</li>" for _ in range(items)) + "</ul>")
+            count += items
+        else:
+            parts.append(f"<p>{make_sentence(rng, 12, 40)} <a href='#'>{rng.choice(WORDS)}</a> {make_sentence(rng, 5, 20)}</p>")
+            count += 1
+    footer = "".join(
+        f"<h3>{text}</h3>" if is_heading else f"<p>{text}</p>" for text, is_heading in BOILERPLATE[4:]
+    )
+    html = (
+        f"<!DOCTYPE html><html><head><title>{title}</title>"
+        f"<meta name='description' content='{make_sentence(rng, 10, 20)}'>"
+        f"<script>var page = {number};</script></head>"
+        f"<body>{nav}<main>{nav}{''.join(parts)}{footer}</main></body></html>"
+    )
+    return html, count + len(BOILERPLATE)
+
+
+class FakeSite:
+    """Serves the synthetic website on a local port"""
+
+    def __init__(self, pages, sitemaps, segments, latency, seed):
+        self.pages = pages
+        self.sitemaps = max(1, sitemaps)
+        self.segments = segments
+        self.latency = latency
+        self.seed = seed
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.total_segments = sum(make_page(seed, n, segments)[1] for n in range(pages))
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def _sitemap(self, index):
+        per_sitemap = -(-self.pages // self.sitemaps)
+        start = index * per_sitemap
+        urls = "".join(
+            f"<url><loc>{self.base_url}page/{n}</loc><lastmod>2024-01-01</lastmod></url>"
+            for n in range(start, min(self.pages, start + per_sitemap))
+        )
+        return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with site.lock:
+                    site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                path = self.path
+                if path == '/sitemap.xml':
+                    children = "".join(
+                        f"<sitemap><loc>{site.base_url}page-sitemap{i + 1}.xml</loc></sitemap>"
+                        for i in range(site.sitemaps)
+                    )
+                    body = f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{children}</sitemapindex>'
+                    return self._send(200, 'application/xml', body)
+                if path.startswith('/page-sitemap') and path.endswith('.xml'):
+                    index = int(path[len('/page-sitemap'):-len('.xml')]) - 1
+                    return self._send(200, 'application/xml', site._sitemap(index))
+                if path.startswith('/page/'):
+                    number = int(path[len('/page/'):])
+                    if number < site.pages:
+                        return self._send(200, 'text/html; charset=utf-8', make_page(site.seed, number, site.segments)[0])
+                self._send(404, 'text/plain', 'Not found')
+
+            def _send(self, status, content_type, body):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+class FakeDeepL:
+    """Stand-in for the DeepL API: /v2/translate and /v2/usage with latency and a rate limit"""
+
+    def __init__(self, latency, rate_limit, character_limit):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.character_limit = character_limit
+        self.lock = threading.Lock()
+        self.recent = []
+        self.calls = 0
+        self.throttled = 0
+        self.characters = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def admit(self, characters):
+        """Apply the rate limit to one translate request, returning the HTTP status"""
+        now = time.monotonic()
+        with self.lock:
+            while self.recent and now - self.recent[0] > 1:
+                self.recent.pop(0)
+            if self.rate_limit and len(self.recent) >= self.rate_limit:
+                self.throttled += 1
+                return 429
+            if self.characters + characters > self.character_limit:
+                return 456
+            self.recent.append(now)
+            self.calls += 1
+            self.characters += characters
+            return 200
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith('/v2/usage'):
+                    return self._usage()
+                self._json(404, {'message': 'Not found'})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.path.startswith('/v2/usage'):
+                    return self._usage()
+                if not self.path.startswith('/v2/translate'):
+                    return self._json(404, {'message': 'Not found'})
+                if 'json' in self.headers.get('Content-Type', ''):
+                    data = json.loads(body)
+                else:
+                    data = parse_qs(body.decode('utf-8'))
+                texts = data.get('text') or []
+                texts = texts if isinstance(texts, list) else [texts]
+                target = data.get('target_lang')
+                target = target[0] if isinstance(target, list) else target
+                status = fake.admit(sum(len(text) for text in texts))
+                if status != 200:
+                    return self._json(status, {'message': 'Too many requests' if status == 429 else 'Quota exceeded'})
+                if fake.latency:
+                    time.sleep(fake.latency)
+                self._json(200, {'translations': [
+                    {'detected_source_language': 'EN', 'text': f"[{target}] {text}", 'billed_characters': len(text)}
+                    for text in texts
+                ]})
+
+            def _usage(self):
+                self._json(200, {'character_count': fake.characters, 'character_limit': fake.character_limit})
+
+            def _json(self, status, value):
+                data = json.dumps(value).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def run_benchmark(args):
+    home = tempfile.mkdtemp(prefix='wtt-benchmark-')
+    output_dir = os.path.join(home, 'outputs')
+    os.makedirs(output_dir)
+    # The app keeps its config, caches and run state under the home directory
+    os.environ['HOME'] = home
+    os.environ['USERPROFILE'] = home
+
+    site = FakeSite(args.pages, args.sitemaps, args.segments, args.site_latency, args.seed)
+    deepl_server = FakeDeepL(args.deepl_latency, args.deepl_rate, args.deepl_character_limit)
+    start(site.server)
+    start(deepl_server.server)
+
+    settings = {'deepl_api_key': 'benchmark:fx', 'deepl_server_url': deepl_server.url}
+    if args.max_workers:
+        settings['max_workers'] = args.max_workers
+    settings.update(json.loads(args.settings or '{}'))
+    os.makedirs(os.path.join(home, '.website-translation-tool'), exist_ok=True)
+    with open(os.path.join(home, '.website-translation-tool', 'config.json'), 'w') as f:
+        json.dump(settings, f)
+
+    # Imported only now so every module sees the temporary home directory
+    from scraper import get_all_urls
+    from document_creator import create_content_only_doc, create_translation_doc
+
+    languages = [language.strip() for language in args.languages.split(',') if language.strip()]
+    results = {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'pages': args.pages, 'sitemaps': args.sitemaps, 'segments_per_page': args.segments,
+            'languages': languages, 'site_latency': args.site_latency,
+            'deepl_latency': args.deepl_latency, 'deepl_rate': args.deepl_rate,
+            'seed': args.seed, 'settings': {k: v for k, v in settings.items() if k != 'deepl_api_key'},
+        },
+        'total_segments': site.total_segments,
+        'phases': {},
+    }
+
+    def phase(name, func, pages=None, segments=None):
+        site_requests = site.requests
+        api_calls, throttled, characters = deepl_server.calls, deepl_server.throttled, deepl_server.characters
+        started = time.perf_counter()
+        value = func()
+        wall = time.perf_counter() - started
+        result = {
+            'wall_seconds': round(wall, 3),
+            'site_requests': site.requests - site_requests,
+            'api_calls': deepl_server.calls - api_calls,
+            'api_throttled': deepl_server.throttled - throttled,
+            'api_characters': deepl_server.characters - characters,
+            'peak_rss_mb': peak_rss_mb(),
+        }
+        if pages is not None:
+            result['pages_per_second'] = round(pages / wall, 2) if wall else None
+        if segments is not None:
+            result['segments_per_second'] = round(segments / wall, 2) if wall else None
+        results['phases'][name] = result
+        print(f"{name}: {result}", file=sys.stderr)
+        return value
+
+    started = time.perf_counter()
+    urls = phase('get_all_urls', lambda: get_all_urls(site.base_url, 'no'))
+    results['urls_found'] = len(urls)
+    phase(
+        'create_content_only_doc',
+        lambda: create_content_only_doc("Benchmark", urls, "EN", output_dir=output_dir),
+        len(urls), site.total_segments,
+    )
+    if languages:
+        phase(
+            'create_translation_doc',
+            lambda: create_translation_doc("Benchmark", urls, "EN", languages, output_dir=output_dir),
+            len(urls), site.total_segments,
+        )
+    results['wall_seconds'] = round(time.perf_counter() - started, 3)
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    site.server.shutdown()
+    deepl_server.server.shutdown()
+    if not args.keep:
+        import shutil
+        shutil.rmtree(home, ignore_errors=True)
+    else:
+        results['home'] = home
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tool end to end against a local fake site and fake DeepL")
+    parser.add_argument('--pages', type=int, default=500, help="pages on the synthetic site (default 500)")
+    parser.add_argument('--sitemaps', type=int, default=5, help="child sitemaps in the sitemap index (default 5)")
+    parser.add_argument('--segments', type=int, default=40, help="approximate content segments per page (default 40)")
+    parser.add_argument('--languages', default='DE,FR', help="comma-separated target languages, empty to skip translation (default DE,FR)")
+    parser.add_argument('--site-latency', type=float, default=0.02, help="seconds added to every site response (default 0.02)")
+    parser.add_argument('--deepl-latency', type=float, default=0.05, help="seconds added to every DeepL response (default 0.05)")
+    parser.add_argument('--deepl-rate', type=float, default=20, help="DeepL requests per second before 429s, 0 for no limit (default 20)")
+    parser.add_argument('--deepl-character-limit', type=int, default=10 ** 9, help="DeepL character quota (default 1e9)")
+    parser.add_argument('--max-workers', type=int, help="max_workers setting for the run")
+    parser.add_argument('--settings', help="extra settings as a JSON object, e.g. '{\"extract_processes\": 4}'")
+    parser.add_argument('--seed', type=int, default=1, help="seed for the synthetic content (default 1)")
+    parser.add_argument('--output', help="write the results JSON to this file")
+    parser.add_argument('--keep', action='store_true', help="keep the temporary home directory and workbooks")
+    args = parser.parse_args(argv)
+
+    # Progress and per-page output go to stderr; stdout is the results JSON
+    import contextlib
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run_benchmark(args)
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
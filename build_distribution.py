@@ -31,7 +31,6 @@ def build_executable():
         '--hidden-import=tkinter.ttk',
         '--hidden-import=tkinter.messagebox',
         '--hidden-import=tkinter.simpledialog',
-        '--hidden-import=bs4',
         '--hidden-import=lxml',
         '--hidden-import=deepl',
         '--hidden-import=xlsxwriter',
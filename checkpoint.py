@@ -0,0 +1,98 @@
+"""Checkpoint journal so an interrupted run can pick up where it stopped"""
+
+import json
+import os
+import sqlite3
+import threading
+from config import get_config_dir
+from incremental import hash_json, safe_file_name
+from page_content import Segment
+
+
+# Bumped when what the journal stores changes, so older journals are discarded
+JOURNAL_FORMAT = 3
+
+
+def get_checkpoint_path(company_name, kind):
+    """Get the path to the checkpoint journal for a company's translation or content-only run"""
+    checkpoint_dir = get_config_dir() / "checkpoints"
+    checkpoint_dir.mkdir(exist_ok=True)
+    return checkpoint_dir / f"{safe_file_name(company_name)}_{kind}.sqlite3"
+
+
+class Checkpoint:
+    """Journal of the finished record of each page in a run
+
+    Each page's record (see writers.py) is committed as soon as it is laid
+    out (after translation), so a crash loses at most the pages still in progress.
+    The journal belongs to one exact run: the same company name, URL list,
+    languages and options. Starting a different run discards it, and a run
+    that finishes deletes it.
+    """
+
+    def __init__(self, company_name, kind, run_options, path=None):
+        self.path = str(path or get_checkpoint_path(company_name, kind))
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, rows TEXT)")
+        run_key = hash_json([JOURNAL_FORMAT, run_options])
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'run'").fetchone()
+        if row is None or row[0] != run_key:
+            # A different run (or none yet): start a fresh journal
+            self._db.execute("DELETE FROM meta")
+            self._db.execute("DELETE FROM pages")
+            self._db.execute("INSERT INTO meta VALUES ('run', ?)", (run_key,))
+        self._db.commit()
+        self._closed = False
+
+    def completed(self):
+        """Get the addresses of the pages already journaled"""
+        with self._lock:
+            return {url for (url,) in self._db.execute("SELECT url FROM pages")}
+
+    def save_page(self, url, record):
+        """Journal the record of a finished page"""
+        data = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?)", (url, data))
+            self._db.commit()
+
+    def get_page(self, url):
+        """Get the journaled record of a page"""
+        with self._lock:
+            row = self._db.execute("SELECT rows FROM pages WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_common(self, common_segments, record):
+        """Journal the common strings found for this run and their record"""
+        data = json.dumps({'segments': common_segments, 'record': record}, ensure_ascii=False)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('common', ?)", (data,))
+            self._db.commit()
+
+    def get_common(self):
+        """Get (common_segments, record) journaled by save_common(), or None"""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE name = 'common'").fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        return [Segment(*segment) for segment in data['segments']], data['record']
+
+    def close(self):
+        """Close the journal, keeping it for the next attempt"""
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._db.close()
+
+    def finish(self):
+        """Close and delete the journal once the workbook has been saved"""
+        self.close()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.path + suffix)
+            except OSError:
+                pass
@@ -0,0 +1,248 @@
+"""Headless command-line batch mode for running many sites without the GUI
+
+Usage:
+    python cli.py manifest.json [--output-dir DIR] [--max-sites N] [--max-requests N] [--log-file FILE]
+
+The manifest is JSON (or YAML if PyYAML is installed) with a list of sites:
+
+    {
+      "output_dir": "outputs",
+      "defaults": {"source_language": "EN-US", "target_languages": ["DE", "FR"]},
+      "sites": [
+        {"base_url": "https://example.com/", "company_name": "Example",
+         "include_blogs": false, "include": ["/products/"], "exclude": ["\\\\.pdf$"],
+         "incremental": true, "output_formats": ["xlsx", "xliff"]}
+      ]
+    }
+
+A JSON summary of every site is printed to stdout (progress goes to
+stderr, one line per site every few seconds, and every progress event to
+--log-file if given). The exit code is 0 if every site succeeded, 1 if any failed and
+2 if the manifest could not be read.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from api_key import find_deepl_key
+from config import get_setting
+from document_creator import create_translation_doc, create_content_only_doc
+from http_client import set_request_limit
+from progress import ProgressBus, ProgressReporter, ProgressView, log_event
+from scraper import get_all_urls
+from writers import WRITERS
+
+# Seconds between progress lines on stderr
+PROGRESS_INTERVAL = 2
+
+
+# Keys a site entry (or the manifest "defaults") may set
+SITE_DEFAULTS = {
+    'source_language': 'EN-US',
+    'target_languages': [],
+    'include_blogs': False,
+    'include': [],
+    'exclude': [],
+    'common_min_pages': None,
+    'incremental': False,
+    'output_formats': None,
+}
+
+
+class ManifestError(Exception):
+    """Raised when the manifest can't be read or is missing required fields"""
+
+
+def load_manifest(path):
+    """Load a JSON or YAML manifest and return (options, sites)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError as e:
+        raise ManifestError(f"Can't read manifest: {e}")
+
+    if path.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ManifestError("YAML manifests need PyYAML (pip install pyyaml); use JSON instead")
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise ManifestError(f"Invalid YAML manifest: {e}")
+    else:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ManifestError(f"Invalid JSON manifest: {e}")
+
+    # A bare list of sites is allowed too
+    if isinstance(data, list):
+        data = {'sites': data}
+    if not isinstance(data, dict) or not isinstance(data.get('sites'), list):
+        raise ManifestError("Manifest must contain a list of sites")
+
+    defaults = dict(SITE_DEFAULTS)
+    defaults.update(data.get('defaults') or {})
+    sites = []
+    for index, entry in enumerate(data['sites']):
+        if not isinstance(entry, dict) or not entry.get('base_url') or not entry.get('company_name'):
+            raise ManifestError(f"Site #{index + 1} needs base_url and company_name")
+        site = dict(defaults)
+        site.update(entry)
+        if not site['base_url'].endswith('/'):
+            site['base_url'] += '/'
+        try:
+            site['include'] = [re.compile(pattern) for pattern in site['include']]
+            site['exclude'] = [re.compile(pattern) for pattern in site['exclude']]
+        except re.error as e:
+            raise ManifestError(f"Site #{index + 1} has an invalid URL filter: {e}")
+        unknown = [name for name in site['output_formats'] or [] if name not in WRITERS]
+        if unknown:
+            raise ManifestError(f"Site #{index + 1} has unknown output formats: {', '.join(unknown)} (choose from {', '.join(WRITERS)})")
+        sites.append(site)
+    return data, sites
+
+
+def filter_urls(urls, include, exclude):
+    """Keep URLs matching any include pattern (if given) and no exclude pattern"""
+    kept = []
+    for url in urls:
+        if include and not any(pattern.search(url.address) for pattern in include):
+            continue
+        if any(pattern.search(url.address) for pattern in exclude):
+            continue
+        kept.append(url)
+    return kept
+
+
+def run_site(site, output_dir, max_workers, progress_bus):
+    """Discover, filter and build the document for one site, returning its summary"""
+    name = site['company_name']
+    started = time.time()
+    summary = {
+        'company_name': name,
+        'base_url': site['base_url'],
+        'status': 'ok',
+        'mode': 'translation' if site['target_languages'] else 'content_only',
+        'urls_found': 0,
+        'urls_processed': 0,
+        'output': None,
+        'outputs': [],
+        'error': None,
+    }
+
+    try:
+        if site['target_languages'] and not find_deepl_key():
+            raise RuntimeError("Translation needs a DeepL API key; set DEEPL_API_KEY or save one in config.json")
+
+        ProgressReporter(progress_bus, name)(0, "Fetching URLs...", site['base_url'])
+        urls = get_all_urls(site['base_url'], 'yes' if site['include_blogs'] else 'no', max_workers)
+        summary['urls_found'] = len(urls)
+        urls = filter_urls(urls, site['include'], site['exclude'])
+        summary['urls_processed'] = len(urls)
+        if not urls:
+            raise RuntimeError("No URLs found in the sitemap (after filtering)")
+
+        if site['target_languages']:
+            paths = create_translation_doc(
+                name, urls, site['source_language'], site['target_languages'],
+                max_workers=max_workers, common_min_pages=site['common_min_pages'], output_dir=output_dir,
+                incremental=site['incremental'], progress_bus=progress_bus, output_formats=site['output_formats'],
+            )
+        else:
+            paths = create_content_only_doc(
+                name, urls, site['source_language'],
+                max_workers=max_workers, common_min_pages=site['common_min_pages'], output_dir=output_dir,
+                incremental=site['incremental'], progress_bus=progress_bus, output_formats=site['output_formats'],
+            )
+        summary['outputs'] = [os.path.abspath(path) for path in paths]
+        summary['output'] = summary['outputs'][0]
+    except Exception as e:
+        summary['status'] = 'error'
+        summary['error'] = f"{type(e).__name__}: {e}"
+
+    summary['seconds'] = round(time.time() - started, 2)
+    return summary
+
+
+def print_progress(progress_bus, stop, interval=PROGRESS_INTERVAL):
+    """Print one line per site whose progress changed, every interval seconds until stop is set"""
+    views = {}
+    while True:
+        stopped = stop.wait(interval)
+        events = {}
+        for event in progress_bus.drain():
+            events.setdefault(event.run, []).append(event)
+        for run, run_events in events.items():
+            views.setdefault(run, ProgressView()).update(run_events)
+        for run, view in views.items():
+            if view.changed:
+                view.changed = False
+                line = f"[{run}] {int(view.percent)}% {view.status} {view.url} {view.operation}".rstrip()
+                rate = view.describe_rate()
+                print(f"{line} ({rate})" if rate else line, file=sys.stderr)
+        if stopped:
+            return
+
+
+def run_manifest(options, sites, output_dir, max_sites, max_requests, max_workers):
+    """Run every site with at most max_sites at once and max_requests HTTP requests in flight"""
+    os.makedirs(output_dir, exist_ok=True)
+    set_request_limit(max_requests)
+    progress_bus = ProgressBus()
+    progress_bus.subscribe(log_event)
+    stop = threading.Event()
+    printer = threading.Thread(target=print_progress, args=(progress_bus, stop), daemon=True)
+    printer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max_sites) as executor:
+            results = list(executor.map(lambda site: run_site(site, output_dir, max_workers, progress_bus), sites))
+    finally:
+        set_request_limit(None)
+        stop.set()
+        printer.join()
+    failed = sum(1 for result in results if result['status'] != 'ok')
+    return {'sites': results, 'succeeded': len(results) - failed, 'failed': failed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Website Translation Tool headless for the sites in a manifest")
+    parser.add_argument('manifest', help="JSON or YAML manifest of sites")
+    parser.add_argument('--output-dir', help="directory for the workbooks (default: manifest output_dir or ./translation_outputs)")
+    parser.add_argument('--max-sites', type=int, help="sites processed at the same time (default 2)")
+    parser.add_argument('--max-requests', type=int, help="HTTP requests in flight across all sites (default 16)")
+    parser.add_argument('--max-workers', type=int, help="page fetch workers per site (default: max_workers setting)")
+    parser.add_argument('--log-file', help="log every progress event (stage, URL, counts, bytes) to this file")
+    args = parser.parse_args(argv)
+
+    if args.log_file:
+        logging.basicConfig(filename=args.log_file, level=logging.INFO, format="%(asctime)s %(message)s")
+
+    try:
+        options, sites = load_manifest(args.manifest)
+    except ManifestError as e:
+        print(json.dumps({'error': str(e)}))
+        return 2
+
+    output_dir = args.output_dir or options.get('output_dir') or 'translation_outputs'
+    max_sites = max(1, args.max_sites or options.get('max_sites') or 2)
+    max_requests = args.max_requests or options.get('max_requests') or 16
+    max_workers = args.max_workers or options.get('max_workers') or get_setting('max_workers')
+
+    # Keep stdout for the machine-readable summary
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = run_manifest(options, sites, output_dir, max_sites, max_requests, max_workers)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,11 +5,44 @@ import json
 from pathlib import Path
 
 
-def get_config_path():
-    """Get the path to the config file"""
+# Defaults for tunable settings stored alongside the API key in config.json
+DEFAULT_SETTINGS = {
+    'max_workers': 8,
+    'translate_workers': 4,
+    'language_workers': 10,
+    'extract_processes': 0,
+    'deepl_requests_per_second': 10,
+    'deepl_max_concurrency': 4,
+    'deepl_server_url': None,
+    'http_connect_timeout': 10,
+    'http_read_timeout': 30,
+    'http_retries': 3,
+    'http_backoff_factor': 0.5,
+    'max_page_mb': 20,
+    'common_strings_min_pages': 0,
+    'trace_runs': False,
+    'checkpoint_runs': True,
+    'translation_memory': True,
+    'translation_cache_memory_entries': 20000,
+    'translation_cache_max_entries': 500000,
+    'translation_cache_max_age_days': 180,
+    'output_formats': ['xlsx'],
+    'xlsx_shard_pages': 0,
+    'xlsx_shard_by': 'pages',
+    'xlsx_shard_processes': 0,
+}
+
+
+def get_config_dir():
+    """Get the directory holding the config file and other app data"""
     config_dir = Path.home() / ".website-translation-tool"
     config_dir.mkdir(exist_ok=True)
-    return config_dir / "config.json"
+    return config_dir
+
+
+def get_config_path():
+    """Get the path to the config file"""
+    return get_config_dir() / "config.json"
 
 
 def load_config():
@@ -40,9 +73,18 @@ def save_config(config_dict):
         return False
 
 
+def get_setting(name, default=None):
+    """Get a tunable setting from the config file, falling back to the built-in default"""
+    config = load_config()
+    if name in config:
+        return config[name]
+    if default is not None:
+        return default
+    return DEFAULT_SETTINGS.get(name)
+
+
 def save_api_key(key):
     """Save API key to config file"""
     config = load_config()
     config['deepl_api_key'] = key
     return save_config(config)
-
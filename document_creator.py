@@ -1,263 +1,460 @@
 """Document creation functions for Excel output"""
 
-import xlsxwriter
-import requests
-from bs4 import BeautifulSoup
-from scraper import fetch_and_parse
-from translator import translate_text
-
-
-def write_content(worksheet, start_row, col, content, translate=False, target_language=None):
-    """Write content to worksheet, optionally translating"""
-    row = start_row
-    if isinstance(content, str):
-        worksheet.write(row, col, content)
-        if translate:
-            translated_text = translate_text(content, target_language)
-            worksheet.write(row, col, translated_text)
-            row += 1
-        return start_row, row
-    else:
-        for item in content:
-            text = item.get_text().strip()
-            if text:
-                worksheet.write(row, col, text)
-                if translate:
-                    translated_text = translate_text(text, target_language)
-                    worksheet.write(row, col, translated_text)
-                row += 1
-        return start_row, row
-
-
-def create_translation_doc(company_name, all_urls, source_language, target_languages, progress_callback=None):
-    """Create translation document with DeepL translations"""
-    workbook = xlsxwriter.Workbook(f'{company_name}.xlsx')
-    bold = workbook.add_format({'bold': True})
-    
-    total_urls = len(all_urls)
-    current_progress = 10  # Start at 10% after initialization
-
-    worksheet = workbook.add_worksheet("Table of Contents")
-    row, col = 0, 0
-    sheet_counter = 2
-
-    # Table of contents
-    if progress_callback:
-        progress_callback(current_progress, "Creating table of contents...", "", "Organizing URLs...")
-    
-    for url in all_urls:
-        worksheet.write(row, col, url.address)
-        worksheet.write(row, col + 1, f"Sheet {sheet_counter}")
-        sheet_counter += 1
-        row += 1
-
-    # Process each URL
-    for i, url in enumerate(all_urls):
-        url_progress = 10 + (i * 80) // total_urls  # 10% to 90%
-        
-        if progress_callback:
-            progress_callback(url_progress, f"Processing URLs ({i+1} of {total_urls})", url.address, "Fetching page...")
-        
-        print(f'Working on: {url.address}')
-        soup = fetch_and_parse(url.address)
-        
-        if progress_callback:
-            progress_callback(url_progress + 2, f"Processing URLs ({i+1} of {total_urls})", url.address, "Parsing content...")
-        worksheet = workbook.add_worksheet()
-
-        # Add source language and target languages to the worksheet
-        worksheet.write('A1', url.address)
-        worksheet.write('A2', source_language)
-        for idx, target_language in enumerate(target_languages):
-            worksheet.write(1, idx + 1, target_language)
-
-        # Extract content from the main section of the HTML
-        site_content = soup.find('main')
-        title = soup.find('title')
-        meta = soup.find('meta', attrs={'name':'description'})
-        try:
-            meta_desc = meta['content']
-        except Exception as e:
-            meta_desc = "None"
-            print(f"Error: {e}")
-
-        # Gather elements in the same order as they appear on the page
-        ordered_elements = site_content.find_all(
-            ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li']
-        ) if site_content else []
-
-        #write title
-        if progress_callback:
-            progress_callback(url_progress + 4, f"Processing URLs ({i+1} of {total_urls})", url.address, "Writing content to Excel...")
-        
-        row = 3
-        worksheet.write(row, 0, 'Title Tag:', bold)
-        start_row = row + 1
-        _, row = write_content(worksheet, start_row, 0, title, False)
-        for idx, target_language in enumerate(target_languages):
-            if target_language == source_language:
-                continue
-            write_content(worksheet, start_row, idx + 1, title, True, target_language)
-
-        #write Meta Desc
-        row +=2
-        worksheet.write(row, 0, 'Meta Description', bold)
-        start_row = row + 1
-        _, row = write_content(worksheet, start_row, 0, meta_desc, False)
-        for idx, target_language in enumerate(target_languages):
-            if target_language == source_language:
-                continue
-            write_content(worksheet, start_row, idx + 1, meta_desc, True, target_language)
-
-        # Write content in document order (headings, paragraphs, list items)
-        row += 2
-        worksheet.write(row, 0, 'Content (ordered):', bold)
-        start_row = row + 1
-        row = start_row
-        for element in ordered_elements:
-            try:
-                text = element.get_text().strip()
-            except Exception:
-                text = ""
-            if not text:
-                continue
-            is_heading = hasattr(element, 'name') and element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
-            # Write source text with formatting if heading
-            if is_heading:
-                worksheet.write(row, 0, text, bold)
-            else:
-                worksheet.write(row, 0, text)
-            # Write translations in same row with matching formatting
-            for idx, target_language in enumerate(target_languages):
-                if target_language == source_language:
-                    continue
-                translated_text = translate_text(text, target_language)
-                if is_heading:
-                    worksheet.write(row, idx + 1, translated_text, bold)
-                else:
-                    worksheet.write(row, idx + 1, translated_text)
-            row += 1
-
-    if progress_callback:
-        progress_callback(95, "Finalizing document...", "", "Saving Excel file...")
-    
-    workbook.close()
-    print("Translation document created successfully!")
-    
-    if progress_callback:
-        progress_callback(100, "Translation complete!", "", "")
-    
-    return workbook
-
-
-def create_content_only_doc(company_name, all_urls, source_language, progress_callback=None):
-    """Create Excel document with scraped content only (no translation)"""
-    # Initialize workbook
-    workbook = xlsxwriter.Workbook(f'{company_name}_content_only.xlsx')
-    bold = workbook.add_format({'bold': True})
-    
+import os
+from config import get_setting
+from extractor import extract_content
+from scraper import fetch_content
+from checkpoint import Checkpoint
+from incremental import RunState
+from pipeline import run_pipeline
+from progress import ProgressBus, ProgressReporter
+from segment_store import SegmentStore
+from tracing import span, count, start_trace, stop_trace
+from translator import translate_languages, check_quota, get_cache_stats, get_limiter_stats
+from writers import open_writers
+
+
+def fetch_page(url):
+    """Fetch the raw HTML bytes of a page and their encoding"""
+    return fetch_content(url.address)
+
+
+def parse_page(url, fetched):
+    """Extract the title, meta description and ordered content of a fetched page"""
+    content, encoding = fetched
+    return extract_content(content, encoding, url.address)
+
+
+def get_page_stages(state, report=None):
+    """Get the fetch and extract pipeline stages, reusing unchanged pages when incremental
+
+    With a ProgressReporter, each fetch reports the bytes downloaded.
+    """
+    fetch, extract = (state.fetch, state.extract) if state else (fetch_page, parse_page)
+    if report is None:
+        return fetch, extract
+
+    def reported_fetch(url):
+        fetched = fetch(url)
+        # (content, encoding), or RunState's dict holding either 'content' or a reused 'page'
+        content = fetched.get('content') if isinstance(fetched, dict) else fetched[0]
+        report.event('fetch', url.address, bytes=len(content or b''))
+        return fetched
+
+    return reported_fetch, extract
+
+
+def get_reporter(company_name, progress_callback, progress_bus):
+    """Get the ProgressReporter a run publishes its progress with
+
+    Events go on progress_bus if given (see progress.py); progress_callback
+    gets every overall status update either way.
+    """
+    if progress_bus is None:
+        progress_bus = ProgressBus(keep_events=False)
+    return ProgressReporter(progress_bus, company_name, progress_callback)
+
+
+def get_status(counts):
+    """Describe how far the pipeline has got, for the progress display"""
+    return (
+        f"Processing URLs ({counts['fetched']} of {counts['total']} fetched, "
+        f"{counts['translated']} translated, {counts['in_flight']} in flight)"
+    )
+
+
+def begin_trace(company_name):
+    """Start recording a run trace if the trace_runs setting is on"""
+    return start_trace(company_name) if get_setting('trace_runs') else None
+
+
+def end_trace(trace, path):
+    """Stop a run trace, save it as Chrome trace JSON and print its summary table"""
+    if trace is None:
+        return
+    stop_trace(trace)
+    try:
+        trace.save(path)
+        print(f"Run trace saved to {path}")
+    except OSError as e:
+        print(f"Couldn't save run trace: {e}")
+    print(trace.summary())
+
+
+def open_checkpoint(company_name, kind, all_urls, source_language, target_languages, common_min_pages):
+    """Open the checkpoint journal for this exact run, if the checkpoint_runs setting is on"""
+    if not get_setting('checkpoint_runs'):
+        return None
+    run_options = [kind, source_language, list(target_languages), common_min_pages, [url.address for url in all_urls]]
+    return Checkpoint(company_name, kind, run_options)
+
+
+def get_completed(checkpoint, all_urls):
+    """Get the indexes of the URLs an interrupted run already finished"""
+    if checkpoint is None:
+        return set()
+    completed = checkpoint.completed()
+    skip = {index for index, url in enumerate(all_urls) if url.address in completed}
+    if skip:
+        print(f"Resuming from checkpoint: {len(skip)} of {len(all_urls)} pages already done")
+    return skip
+
+
+def collect_pages(all_urls, state, report, max_workers=None):
+    """Fetch every page up front, for runs that need to see all pages before writing
+
+    Returns (page, error) for each URL, in URL order, ready to be passed
+    back to run_pipeline as pages.
+    """
     total_urls = len(all_urls)
-    current_progress = 10  # Start at 10% after initialization
-    
-    # Table of contents
-    if progress_callback:
-        progress_callback(current_progress, "Creating table of contents...", "", "Organizing URLs...")
-    
-    worksheet = workbook.add_worksheet("Table of Contents")
-    row, col = 0, 0
-    sheet_counter = 2
-
-    for url in all_urls:
-        worksheet.write(row, col, url.address)
-        worksheet.write(row, col + 1, f"Sheet {sheet_counter}")
-        sheet_counter += 1
-        row += 1
-    
-    # Process each URL
-    for i, url in enumerate(all_urls):
-        url_progress = 10 + (i * 80) // total_urls  # 10% to 90%
-        
-        if progress_callback:
-            progress_callback(url_progress, f"Processing URLs ({i+1} of {total_urls})", url.address, "Fetching page...")
+    pages = []
+
+    def collect(index, url, page, translated, error, counts):
+        pages.append((page, error))
+        report.event('collect', url.address, counts, segments=len(page.segments) if page else 0)
+        status = f"Fetching URLs ({counts['fetched']} of {total_urls} fetched, {counts['in_flight']} in flight)"
+        report(10 + (index * 40) // total_urls, status, url.address, "Finding repeated content...", counts)
+
+    fetch, extract = get_page_stages(state, report)
+    run_pipeline(all_urls, collect, fetch, extract, max_workers=max_workers)
+    return pages
+
+
+def get_output_writers(company_name, kind, all_urls, source_language, target_languages, output_dir, output_formats):
+    """Create the writers for a run (output_formats defaults to the output_formats setting)
+
+    The workbook is sharded when there are more URLs than the
+    xlsx_shard_pages setting allows in one workbook.
+    """
+    base_name = company_name if kind == 'translation' else f"{company_name}_content_only"
+    shard_pages = int(get_setting('xlsx_shard_pages') or 0)
+    if len(all_urls) <= shard_pages:
+        shard_pages = 0
+    return open_writers(
+        output_formats or get_setting('output_formats'),
+        os.path.join(output_dir or '', base_name), kind, source_language, target_languages,
+        shard_pages, get_setting('xlsx_shard_by'), int(get_setting('xlsx_shard_processes') or 0),
+    )
+
+
+def close_writers(writers):
+    """Finish every writer, returning the paths of the files written"""
+    paths = []
+    for writer in writers:
+        writer.close()
+        paths.extend(writer.paths)
+    return paths
+
+
+def abort_writers(writers):
+    """Release the files of writers left open by a failed run"""
+    for writer in writers:
         try:
-            # Fetch and parse the page
-            if progress_callback:
-                progress_callback(url_progress + 2, f"Processing URLs ({i+1} of {total_urls})", url.address, "Parsing content...")
-            
-            response = requests.get(url.address)
-            html_content = response.text
-            soup = BeautifulSoup(html_content, 'lxml')
-            
-            worksheet = workbook.add_worksheet()
-            
-            # Add URL and language info
-            worksheet.write('A1', url.address)
-            worksheet.write('A2', f"Source Language: {source_language}")
-            
-            if progress_callback:
-                progress_callback(url_progress + 4, f"Processing URLs ({i+1} of {total_urls})", url.address, "Writing content to Excel...")
-            
-            # Extract content from the main section
-            site_content = soup.find('main')
-            title = soup.find('title')
-            meta = soup.find('meta', attrs={'name':'description'})
-            
+            writer.abort()
+        except Exception:
+            pass
+
+
+def find_common_segments(pages, min_pages):
+    """Find segments that repeat on at least min_pages of the fetched pages"""
+    store = SegmentStore()
+    for page, error in pages:
+        if page is not None:
+            store.add_page(page.segments)
+    return store.common_segments(min_pages)
+
+
+def create_translation_doc(company_name, all_urls, source_language, target_languages, progress_callback=None, max_workers=None, common_min_pages=None, output_dir=None, incremental=False, progress_bus=None, output_formats=None):
+    """Create translation document with DeepL translations
+
+    Segments found on at least common_min_pages pages (config setting
+    common_strings_min_pages, 0 to disable) are translated once and written
+    to a shared "Common Strings" sheet instead of on every page.
+
+    With incremental=True, pages that haven't changed since the last run for
+    this company name are reused (content and translations) instead of being
+    fetched and translated again.
+
+    Progress goes to progress_callback(percent, status, url, operation) and,
+    as ProgressEvents named after the company, to progress_bus if given.
+
+    output_formats lists the files to write in the same run (see writers.py:
+    'xlsx', 'csv', 'jsonl', 'xliff'; default: the output_formats setting).
+    Returns the paths of the files written.
+    """
+    trace = begin_trace(company_name)
+    report = get_reporter(company_name, progress_callback, progress_bus)
+    checkpoint = None
+    state = None
+    writers = []
+    try:
+        writers = get_output_writers(company_name, 'translation', all_urls, source_language, target_languages, output_dir, output_formats)
+
+        total_urls = len(all_urls)
+        current_progress = 10  # Start at 10% after initialization
+
+        if common_min_pages is None:
+            common_min_pages = get_setting('common_strings_min_pages')
+
+        # Stop before fetching anything if there are no characters left to translate with
+        if any(target_language != source_language for target_language in target_languages):
+            check_quota()
+
+        report(current_progress, f"Processing URLs (0 of {total_urls})", "", "Fetching pages...")
+
+        # Pages are fetched, parsed and translated concurrently but written in
+        # URL order, so worksheet N always matches "Sheet N" in the table of contents
+        state = RunState(company_name) if incremental else None
+        checkpoint = open_checkpoint(
+            company_name, 'translation', all_urls, source_language, target_languages, common_min_pages
+        )
+        resumed = checkpoint.get_common() if checkpoint and common_min_pages else None
+        pages = None
+        common_segments = []
+        common_record = None
+        if resumed:
+            # The interrupted run already found (and translated) the common strings
+            common_segments, common_record = resumed
+        elif common_min_pages:
+            # Boilerplate can only be told apart once every page has been seen
+            pages = collect_pages(all_urls, state, report, max_workers)
+            common_segments = find_common_segments(pages, common_min_pages)
+            current_progress = 50
+        common_texts = {segment.text for segment in common_segments}
+
+        # Table of contents
+        report(current_progress, "Creating table of contents...", "", "Organizing URLs...")
+
+        for writer in writers:
+            writer.begin(all_urls, bool(common_segments))
+
+        if common_segments and common_record is None:
+            report(current_progress, "Translating common strings...", "", f"{len(common_segments)} repeated segments")
+            common_texts_list = [segment.text for segment in common_segments]
+            with span('common_strings.translate', segments=len(common_texts_list)):
+                common_translations = translate_languages(
+                    common_texts_list,
+                    [target_language for target_language in target_languages if target_language != source_language],
+                    source_language,
+                )
+            common_record = {'url': None, 'segments': [
+                ['content', text, level, [
+                    common_translations[target_language][index] if target_language in common_translations else None
+                    for target_language in target_languages
+                ]]
+                for index, (text, level) in enumerate(common_segments)
+            ]}
+            if checkpoint:
+                checkpoint.save_common(common_segments, common_record)
+        if common_segments:
+            for writer in writers:
+                writer.write_common(common_record, common_min_pages)
+
+        def translate_page(url, page):
+            title_texts = [page.title] if page.title else []
+            meta_desc = page.meta_description
+            # Repeated boilerplate lives on the common strings sheet
+            content = [segment for segment in page.segments if segment.text not in common_texts]
+            count('segments', len(content))
+
+            # Translate the whole page in as few DeepL requests as possible:
+            # title rows, then the meta description, then the ordered content
+            page_texts = title_texts + [meta_desc] + [segment.text for segment in content]
+            stored = state.get_translations(url.address, page_texts) if state else {}
+            # Every language still missing is translated at the same time
+            translations = {
+                target_language: stored[target_language]
+                for target_language in target_languages
+                if target_language != source_language and target_language in stored
+            }
+            translations.update(translate_languages(
+                page_texts,
+                [target_language for target_language in target_languages
+                 if target_language != source_language and target_language not in stored],
+                source_language,
+            ))
+            if state and any(language not in stored for language in translations):
+                state.save_translations(url.address, page_texts, {**stored, **translations})
+
+            def with_translations(field, text, index, level=0):
+                return [field, text, level, [
+                    translations[target_language][index] if target_language in translations else None
+                    for target_language in target_languages
+                ]]
+
+            # The page record: title, meta description and content in document order
+            segments = [with_translations('title', text, index) for index, text in enumerate(title_texts)]
+            segments.append(with_translations('meta_description', meta_desc, len(title_texts)))
+            for index, (text, level) in enumerate(content, start=len(title_texts) + 1):
+                segments.append(with_translations('content', text, index, level))
+            record = {'url': url.address, 'segments': segments}
+
+            # Journal the page before it waits for its turn to be written
+            if checkpoint:
+                checkpoint.save_page(url.address, record)
+            return record
+
+        def write_page(i, url, page, record, error, counts):
+            url_progress = current_progress + (i * (90 - current_progress)) // total_urls  # up to 90%
+
+            print(f'Working on: {url.address}')
+            if error is not None:
+                raise error
+            if record is None:
+                record = checkpoint.get_page(url.address)
+
+            report.event('write', url.address, counts, segments=len(page.segments) if page else 0)
+            report(url_progress + 2, get_status(counts), url.address, "Writing content to Excel...", counts)
+            for writer in writers:
+                writer.write_page(i, record)
+
+        fetch, extract = get_page_stages(state, report)
+        run_pipeline(
+            all_urls, write_page, fetch, extract, translate_page,
+            pages=pages, skip=get_completed(checkpoint, all_urls), max_workers=max_workers,
+        )
+
+        report(95, "Finalizing document...", "", "Saving Excel file...")
+
+        paths = close_writers(writers)
+        writers = []
+        if checkpoint:
+            checkpoint.finish()
+        print("Translation document created successfully!")
+        if state:
+            print(f"Incremental run: {state.summary()}")
+        stats = get_cache_stats()
+        print(f"Translation cache: {stats['memory_hits'] + stats['disk_hits']} hits, {stats['misses']} misses")
+        stats = get_limiter_stats()
+        print(f"DeepL: {stats['requests']} requests, {stats['throttled']} throttled, {stats['characters']} characters")
+
+        report.clear()
+        report(100, "Translation complete!", "", "")
+
+        return paths
+    finally:
+        abort_writers(writers)
+        if state:
+            state.close()
+        if checkpoint:
+            checkpoint.close()
+        report.close()
+        end_trace(trace, os.path.join(output_dir or '', f'{company_name}_trace.json'))
+
+
+def create_content_only_doc(company_name, all_urls, source_language, progress_callback=None, max_workers=None, common_min_pages=None, output_dir=None, incremental=False, progress_bus=None, output_formats=None):
+    """Create Excel document with scraped content only (no translation)
+
+    Segments found on at least common_min_pages pages are written once to a
+    shared "Common Strings" sheet, incremental=True reuses unchanged pages
+    from the last run, and progress and output_formats work as in
+    create_translation_doc. Returns the paths of the files written.
+    """
+    trace = begin_trace(company_name)
+    report = get_reporter(company_name, progress_callback, progress_bus)
+    checkpoint = None
+    state = None
+    writers = []
+    try:
+        # Initialize the output files
+        writers = get_output_writers(company_name, 'content_only', all_urls, source_language, [], output_dir, output_formats)
+
+        total_urls = len(all_urls)
+        current_progress = 10  # Start at 10% after initialization
+
+        if common_min_pages is None:
+            common_min_pages = get_setting('common_strings_min_pages')
+
+        report(current_progress, f"Processing URLs (0 of {total_urls})", "", "Fetching pages...")
+
+        # Process each URL (fetched concurrently, written in URL order)
+        state = RunState(company_name) if incremental else None
+        checkpoint = open_checkpoint(company_name, 'content_only', all_urls, source_language, [], common_min_pages)
+        resumed = checkpoint.get_common() if checkpoint and common_min_pages else None
+        pages = None
+        common_segments = []
+        if resumed:
+            common_segments = resumed[0]
+        elif common_min_pages:
+            # Boilerplate can only be told apart once every page has been seen
+            pages = collect_pages(all_urls, state, report, max_workers)
+            common_segments = find_common_segments(pages, common_min_pages)
+            current_progress = 50
+        common_texts = {segment.text for segment in common_segments}
+
+        # Table of contents
+        report(current_progress, "Creating table of contents...", "", "Organizing URLs...")
+
+        for writer in writers:
+            writer.begin(all_urls, bool(common_segments))
+
+        if common_segments:
+            common_record = {'url': None, 'segments': [
+                ['content', text, level, []] for text, level in common_segments
+            ]}
+            if checkpoint and not resumed:
+                checkpoint.save_common(common_segments, common_record)
+            for writer in writers:
+                writer.write_common(common_record, common_min_pages)
+
+        def layout_page(url, page):
+            # Title, meta description and content in document order; repeated
+            # boilerplate lives on the common strings sheet
+            segments = [['title', page.title, 0, []]] if page.title else []
+            segments.append(['meta_description', page.meta_description, 0, []])
+            content = [segment for segment in page.segments if segment.text not in common_texts]
+            count('segments', len(content))
+            for text, level in content:
+                segments.append(['content', text, level, []])
+            record = {'url': url.address, 'segments': segments}
+
+            if checkpoint:
+                checkpoint.save_page(url.address, record)
+            return record
+
+        def write_page(i, url, page, record, error, counts):
+            url_progress = current_progress + (i * (90 - current_progress)) // total_urls  # up to 90%
+
             try:
-                meta_desc = meta['content'] if meta else "None"
-            except:
-                meta_desc = "None"
-            
-            # Get ordered elements
-            ordered_elements = site_content.find_all(
-                ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li']
-            ) if site_content else []
-            
-            # Write title
-            row = 3
-            worksheet.write(row, 0, 'Title Tag:', bold)
-            start_row = row + 1
-            if title:
-                worksheet.write(start_row, 0, title.get_text().strip())
-            
-            # Write meta description
-            row = start_row + 2
-            worksheet.write(row, 0, 'Meta Description:', bold)
-            start_row = row + 1
-            worksheet.write(start_row, 0, meta_desc)
-            
-            # Write content in document order
-            row = start_row + 2
-            worksheet.write(row, 0, 'Content (ordered):', bold)
-            start_row = row + 1
-            row = start_row
-            
-            for element in ordered_elements:
-                try:
-                    text = element.get_text().strip()
-                except:
-                    text = ""
-                if not text:
-                    continue
-                
-                is_heading = hasattr(element, 'name') and element.name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
-                
-                # Write text with formatting if heading
-                if is_heading:
-                    worksheet.write(row, 0, text, bold)
-                else:
-                    worksheet.write(row, 0, text)
-                row += 1
-                
-        except Exception as e:
-            print(f"Error processing {url.address}: {e}")
-            continue
-    
-    if progress_callback:
-        progress_callback(95, "Finalizing document...", "", "Saving Excel file...")
-    
-    workbook.close()
-    print("Content-only document created successfully!")
-    
-    if progress_callback:
-        progress_callback(100, "Content extraction complete!", "", "")
+                if error is not None:
+                    raise error
+                if record is None:
+                    record = checkpoint.get_page(url.address)
+
+                report.event('write', url.address, counts, segments=len(page.segments) if page else 0)
+                report(url_progress + 2, get_status(counts), url.address, "Writing content to Excel...", counts)
+
+                for writer in writers:
+                    writer.write_page(i, record)
+
+            except Exception as e:
+                print(f"Error processing {url.address}: {e}")
+
+        fetch, extract = get_page_stages(state, report)
+        run_pipeline(
+            all_urls, write_page, fetch, extract, layout_page,
+            pages=pages, skip=get_completed(checkpoint, all_urls), max_workers=max_workers,
+        )
+
+        report(95, "Finalizing document...", "", "Saving Excel file...")
+
+        paths = close_writers(writers)
+        writers = []
+        if checkpoint:
+            checkpoint.finish()
+        print("Content-only document created successfully!")
+        if state:
+            print(f"Incremental run: {state.summary()}")
+
+        report.clear()
+        report(100, "Content extraction complete!", "", "")
 
+        return paths
+    finally:
+        abort_writers(writers)
+        if state:
+            state.close()
+        if checkpoint:
+            checkpoint.close()
+        report.close()
+        end_trace(trace, os.path.join(output_dir or '', f'{company_name}_content_only_trace.json'))
@@ -0,0 +1,195 @@
+"""Page content extraction using lxml"""
+
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import lxml.html
+from lxml import etree
+from config import get_setting
+from page_content import PageContent, Segment
+
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# Precompiled XPath expressions, evaluated once per page
+_TITLE = etree.XPath('(//title)[1]')
+_META_DESCRIPTION = etree.XPath("(//meta[@name='description'])[1]")
+_MAIN = etree.XPath('(//main)[1]')
+_SEGMENTS = etree.XPath(
+    './/*[self::h1 or self::h2 or self::h3 or self::h4 or self::h5 or self::h6 or self::p or self::li]'
+)
+# Text inside these tags is not visible page content; BeautifulSoup's
+# get_text() leaves it out too
+HIDDEN_TEXT_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+ASCII_SPACES = ' \n\t\f\r'
+
+# Where a page without a declared encoding says what it is: a byte order
+# mark, or a <meta charset> / http-equiv Content-Type near the start
+BYTE_ORDER_MARKS = ((b'\xef\xbb\xbf', 'utf-8-sig'), (b'\xff\xfe', 'utf-16'), (b'\xfe\xff', 'utf-16'))
+_META_CHARSET = re.compile(rb'<meta[^>]*?charset\s*=\s*["\']?\s*([-\w.:]+)', re.IGNORECASE)
+SNIFF_BYTES = 4096
+
+
+def _make_parser(encoding):
+    return lxml.html.HTMLParser(encoding=encoding, huge_tree=True)
+
+
+_utf8_parser = _make_parser('utf-8')
+
+
+def _collapse(text, preserve):
+    """Collapse a whitespace-only text node to a single space or newline"""
+    if preserve or text.strip(ASCII_SPACES):
+        return text
+    return '\n' if '\n' in text else ' '
+
+
+def _collect_text(element, parts, preserve):
+    """Append the visible text inside element to parts, in document order"""
+    if element.text:
+        parts.append(_collapse(element.text, preserve))
+    for child in element:
+        # Comments and processing instructions have no str tag, only a tail
+        if isinstance(child.tag, str) and child.tag not in HIDDEN_TEXT_TAGS:
+            _collect_text(child, parts, preserve or child.tag in PRESERVE_WHITESPACE_TAGS)
+        if child.tail:
+            parts.append(_collapse(child.tail, preserve))
+
+
+def get_text(element):
+    """Get the visible text of an element, matching BeautifulSoup's get_text()
+
+    Text in script/style/template/ruby annotation tags is skipped and
+    whitespace-only text nodes are collapsed, as BeautifulSoup does.
+    """
+    preserve = element.tag in PRESERVE_WHITESPACE_TAGS
+    for ancestor in element.iterancestors():
+        if ancestor.tag in HIDDEN_TEXT_TAGS:
+            return ''
+        if ancestor.tag in PRESERVE_WHITESPACE_TAGS:
+            preserve = True
+    if element.tag in HIDDEN_TEXT_TAGS:
+        return ''
+    parts = []
+    _collect_text(element, parts, preserve)
+    return ''.join(parts)
+
+
+def parse_html(html, encoding=None):
+    """Parse an HTML document from text or bytes, returning None if it is empty"""
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+        parser = _utf8_parser
+    else:
+        parser = _make_parser(encoding) if encoding else None
+    if not html.strip():
+        return None
+    try:
+        return lxml.html.document_fromstring(html, parser=parser)
+    except (etree.ParserError, ValueError, LookupError):
+        return None
+
+
+def extract_page(html, encoding=None, url=None):
+    """Extract the title, meta description and ordered content of a page
+
+    Returns a PageContent with:
+        title: title tag text ('' if there is none)
+        meta_description: meta description content ("None" if there is none)
+        segments: a Segment (text, heading level) for each non-empty h1-h6,
+                  p and li inside <main>, in document order (empty without <main>)
+    Only plain strings are kept, so the parsed tree is freed on return.
+    """
+    page = PageContent(url)
+    root = parse_html(html, encoding)
+    if root is None:
+        return page
+
+    title = _TITLE(root)
+    if title:
+        page.title = get_text(title[0]).strip()
+
+    meta = _META_DESCRIPTION(root)
+    if meta and meta[0].get('content') is not None:
+        page.meta_description = meta[0].get('content')
+
+    main = _MAIN(root)
+    if main:
+        segments = []
+        for element in _SEGMENTS(main[0]):
+            text = get_text(element).strip()
+            if text:
+                segments.append(Segment(text, int(element.tag[1]) if element.tag in HEADING_TAGS else 0))
+        page.segments = tuple(segments)
+    return page
+
+
+def sniff_encoding(content):
+    """Get the encoding a page declares in its own bytes, or None"""
+    for mark, encoding in BYTE_ORDER_MARKS:
+        if content.startswith(mark):
+            return encoding
+    match = _META_CHARSET.search(content, 0, SNIFF_BYTES)
+    return match.group(1).decode('ascii') if match else None
+
+
+def decode_html(content, encoding):
+    """Decode the raw bytes of a page with the encoding declared in its Content-Type
+
+    Without one, the page's own byte order mark or <meta> charset is used,
+    then UTF-8 if the bytes are valid UTF-8, else Windows-1252. Each is a
+    single codec pass, where requests' response.text would run character
+    detection over the whole body.
+    """
+    if not encoding:
+        encoding = sniff_encoding(content)
+    if not encoding:
+        try:
+            return content.decode('utf-8')
+        except UnicodeDecodeError:
+            encoding = 'windows-1252'
+    try:
+        return str(content, encoding, errors='replace')
+    except (LookupError, TypeError):
+        return str(content, errors='replace')
+
+
+def _extract_content(content, encoding, url=None):
+    return extract_page(decode_html(content, encoding), url=url)
+
+
+_process_pool = None
+_process_pool_checked = False
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """Get the shared extraction process pool, or None to parse in threads
+
+    Created on first use with extract_processes worker processes; 0 (the
+    default) keeps parsing in the calling thread.
+    """
+    global _process_pool, _process_pool_checked
+    if _process_pool_checked:
+        return _process_pool
+    with _process_pool_lock:
+        if not _process_pool_checked:
+            processes = int(get_setting('extract_processes') or 0)
+            if processes > 0:
+                _process_pool = ProcessPoolExecutor(max_workers=processes)
+            _process_pool_checked = True
+        return _process_pool
+
+
+def extract_content(content, encoding=None, url=None):
+    """Extract a PageContent from the raw bytes of a response
+
+    With extract_processes set, parsing runs in a worker process: only the
+    bytes go over and only the extracted page comes back, so the parent
+    process is left with fetching, translating and writing.
+    """
+    pool = get_process_pool()
+    if pool is None:
+        return _extract_content(content, encoding, url)
+    return pool.submit(_extract_content, content, encoding, url).result()
@@ -0,0 +1,120 @@
+"""Shared HTTP session with connection pooling, timeouts and retries"""
+
+import threading
+from contextlib import contextmanager, nullcontext
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import get_setting
+
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Never wait longer than this for a single Retry-After hint
+MAX_RETRY_AFTER = 120
+
+USER_AGENT = "Website-Translation-Tool"
+
+_session = None
+_pool_size = 0
+_timeout = None
+_session_lock = threading.Lock()
+
+# Optional process-wide cap on concurrent requests (see set_request_limit)
+_request_slots = None
+
+
+class CappedRetry(Retry):
+    """urllib3 Retry that honours Retry-After but caps how long it will sleep"""
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
+def get_timeout():
+    """Get the (connect, read) timeout for requests"""
+    return (get_setting('http_connect_timeout'), get_setting('http_read_timeout'))
+
+
+def _make_adapter(pool_size):
+    """Build a pooled adapter with exponential backoff, jitter and Retry-After support"""
+    retry = CappedRetry(
+        total=get_setting('http_retries'),
+        backoff_factor=get_setting('http_backoff_factor'),
+        backoff_jitter=get_setting('http_backoff_factor'),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=16, pool_maxsize=pool_size, max_retries=retry)
+
+
+def get_session(pool_size=None):
+    """Get the shared session, growing its connection pool to at least pool_size"""
+    global _session, _pool_size, _timeout
+    if pool_size is None:
+        if _session is not None:
+            return _session
+        pool_size = get_setting('max_workers')
+    pool_size = max(1, int(pool_size))
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers['User-Agent'] = USER_AGENT
+            _timeout = get_timeout()
+        if pool_size > _pool_size:
+            adapter = _make_adapter(pool_size)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _pool_size = pool_size
+        return _session
+
+
+def set_request_limit(limit):
+    """Cap the number of requests in flight across all threads (None or 0 for no cap)"""
+    global _request_slots
+    _request_slots = threading.BoundedSemaphore(limit) if limit else None
+
+
+def request_slot():
+    """Get a context manager holding one request slot (see set_request_limit)"""
+    slots = _request_slots
+    return nullcontext() if slots is None else slots
+
+
+def http_get(url, **kwargs):
+    """GET a URL through the shared session with the configured timeouts"""
+    session = get_session()
+    kwargs.setdefault('timeout', _timeout)
+    with request_slot():
+        return session.get(url, **kwargs)
+
+
+@contextmanager
+def http_stream(url, **kwargs):
+    """GET a URL with stream=True, as `with http_stream(url) as response:`
+
+    The request slot is held until the block exits, so set_request_limit
+    also caps how many bodies are downloading, and the response is closed
+    on exit (dropping the connection if its body wasn't read).
+    """
+    session = get_session()
+    kwargs.setdefault('timeout', _timeout)
+    with request_slot():
+        with session.get(url, stream=True, **kwargs) as response:
+            yield response
+
+
+def close_session():
+    """Close the shared session and its pooled connections"""
+    global _session, _pool_size
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _pool_size = 0
@@ -0,0 +1,165 @@
+"""Incremental re-runs: remember each page between runs and skip unchanged ones"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from config import get_config_dir
+from extractor import extract_content
+from http_client import http_stream
+from page_content import PageContent
+from scraper import read_page
+
+
+def safe_file_name(name):
+    """Turn a company name into something usable as a file name"""
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', name).strip('_') or 'site'
+
+
+def get_state_path(company_name):
+    """Get the path to the run state database for a company"""
+    state_dir = get_config_dir() / "runs"
+    state_dir.mkdir(exist_ok=True)
+    return state_dir / f"{safe_file_name(company_name)}.sqlite3"
+
+
+def hash_json(value):
+    """Hash a JSON-serializable value (used for page content and page texts)"""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class RunState:
+    """What each URL looked like on the previous run of a site
+
+    Stores, per URL, the sitemap lastmod, the ETag/Last-Modified response
+    headers, the extracted page and its hash, and the translated rows of
+    the page. Safe to use from several fetch workers at once.
+    """
+
+    def __init__(self, company_name, path=None):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path or get_state_path(company_name)), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, lastmod TEXT, etag TEXT, last_modified TEXT, "
+            "content_hash TEXT, page TEXT, texts_hash TEXT, translations TEXT, updated REAL)"
+        )
+        self._db.commit()
+        self.skipped = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.changed = 0
+
+    def _get(self, url):
+        """Get the stored record for a URL as a dict, or None (lock must be held)"""
+        cursor = self._db.execute(
+            "SELECT lastmod, etag, last_modified, content_hash, page, texts_hash, translations "
+            "FROM pages WHERE url = ?", (url,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        keys = ('lastmod', 'etag', 'last_modified', 'content_hash', 'page', 'texts_hash', 'translations')
+        return dict(zip(keys, row))
+
+    def _save_page(self, url, lastmod, etag, last_modified, page):
+        """Store the latest fetch of a URL, keeping its translations if the content didn't change"""
+        data = page.to_dict()
+        content_hash = hash_json(data)
+        with self._lock:
+            previous = self._get(url)
+            keep_translations = previous is not None and previous['content_hash'] == content_hash
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url, lastmod, etag, last_modified, content_hash, json.dumps(data, ensure_ascii=False),
+                    previous['texts_hash'] if keep_translations else None,
+                    previous['translations'] if keep_translations else None,
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+            if previous is None or not keep_translations:
+                self.changed += 1
+            else:
+                self.unchanged += 1
+
+    def fetch(self, url):
+        """Fetch a page unless the previous run's copy can be reused
+
+        Pages whose sitemap lastmod is the same as last time aren't requested
+        at all; the rest are fetched with a conditional GET. Returns a dict
+        for extract(): either the reused 'page' or the fetched 'content'.
+        """
+        lastmod = getattr(url, 'lastmod', None)
+        with self._lock:
+            previous = self._get(url.address)
+        if previous is not None and previous['page'] is not None:
+            if lastmod and previous['lastmod'] == lastmod:
+                with self._lock:
+                    self.skipped += 1
+                return {'page': PageContent.from_dict(json.loads(previous['page']), url.address)}
+
+        headers = {}
+        if previous is not None and previous['page'] is not None:
+            if previous['etag']:
+                headers['If-None-Match'] = previous['etag']
+            if previous['last_modified']:
+                headers['If-Modified-Since'] = previous['last_modified']
+        with http_stream(url.address, headers=headers) as response:
+            if response.status_code == 304 and previous is not None:
+                with self._lock:
+                    self.not_modified += 1
+                    self._db.execute("UPDATE pages SET lastmod = ?, updated = ? WHERE url = ?", (lastmod, time.time(), url.address))
+                    self._db.commit()
+                return {'page': PageContent.from_dict(json.loads(previous['page']), url.address)}
+
+            content, encoding = read_page(response, url.address)
+            return {
+                'content': content,
+                'encoding': encoding,
+                'ok': response.status_code == 200,
+                'lastmod': lastmod,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+
+    def extract(self, url, fetched):
+        """Extract a fetched page (or return the reused one) and remember it for the next run"""
+        if 'page' in fetched:
+            return fetched['page']
+        page = extract_content(fetched['content'], fetched['encoding'], url.address)
+        if fetched['ok']:
+            self._save_page(url.address, fetched['lastmod'], fetched['etag'], fetched['last_modified'], page)
+        return page
+
+    def get_translations(self, url, page_texts):
+        """Get the stored {language: translations} for a page if its texts are unchanged"""
+        with self._lock:
+            previous = self._get(url)
+        if previous is None or previous['translations'] is None or previous['texts_hash'] != hash_json(page_texts):
+            return {}
+        return json.loads(previous['translations'])
+
+    def save_translations(self, url, page_texts, translations):
+        """Store the translated rows of a page for the next run"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET texts_hash = ?, translations = ? WHERE url = ?",
+                (hash_json(page_texts), json.dumps(translations, ensure_ascii=False), url),
+            )
+            self._db.commit()
+
+    def summary(self):
+        """Describe how many pages were reused or refetched in this run"""
+        return (
+            f"{self.skipped} skipped (sitemap lastmod unchanged), {self.not_modified} not modified, "
+            f"{self.unchanged} refetched but unchanged, {self.changed} new or changed"
+        )
+
+    def close(self):
+        """Close the state database"""
+        with self._lock:
+            self._db.close()
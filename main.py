@@ -1,18 +1,37 @@
-"""Main GUI application for Website Translation Tool"""
+"""Main GUI application for Website Translation Tool
+
+Only tkinter and the app's light modules are imported at startup. The
+scraper and document builders (requests, lxml, deepl, xlsxwriter) are
+imported when a fetch or run starts, and the API key and update checks
+run once the window is up, so the window appears as fast as possible.
+Run startup_budget.py to measure it.
+"""
 
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
 import threading
 import os
+import queue
+import sys
 
 # Import from our modules
 from constants import LANGUAGE_NAMES
-from api_key import get_deepl_key, clear_cached_key
+from api_key import get_deepl_key, find_deepl_key, clear_cached_key
 from config import save_api_key
 from updates import check_for_updates, show_update_dialog
-from scraper import get_all_urls
-from document_creator import create_translation_doc, create_content_only_doc
-from translator import clear_translator
+from url_list import URLList
+from progress import ProgressBus, ProgressReporter, ProgressView
+
+# How often URLs found by a running sitemap fetch are added to the list
+URL_LIST_UPDATE_MS = 100
+# How often progress events are drained and shown (10 frames per second)
+PROGRESS_FRAME_MS = 100
+# Delays after the window is created before the API key prompt (if no key is
+# saved) and the update check, so neither holds up the first window
+API_KEY_CHECK_DELAY_MS = 100
+UPDATE_CHECK_DELAY_MS = 2000
+# Output files named in the completion message
+MAX_LISTED_FILES = 6
 
 
 class TranslationApp:
@@ -37,15 +56,29 @@ class TranslationApp:
         self.source_language = tk.StringVar(value="EN-US - English (US)")
         self.target_languages = []
         self.include_blogs = tk.BooleanVar(value=False)
-        self.selected_urls = []
-        self.all_urls = []
+        self.incremental = tk.BooleanVar(value=False)
+        self.url_filter = tk.StringVar()
+        self.url_filter_regex = tk.BooleanVar(value=False)
+        self.url_order = None  # address -> position in sitemap order, once a fetch finishes
+        self.fetch_id = 0
         self.has_api_key = False
         
+        # Progress from every thread goes through the bus and is shown at a fixed frame rate
+        self.progress_bus = ProgressBus()
+        self.progress_reporter = ProgressReporter(self.progress_bus, "app")
+        self.progress_view = ProgressView()
+        
         self.setup_ui()
-        self.check_api_key_status()
+        self.root.after(PROGRESS_FRAME_MS, self.render_progress_loop)
+        
+        # Only look for a saved key now; prompting for a missing one waits
+        # until the window is showing
+        self.has_api_key = bool(find_deepl_key())
+        self.update_ui_for_mode()
+        self.root.after(API_KEY_CHECK_DELAY_MS, self.check_api_key_status)
         
-        # Check for updates in background (non-blocking)
-        self.check_for_updates()
+        # Check for updates in background (non-blocking), after startup
+        self.root.after(UPDATE_CHECK_DELAY_MS, self.check_for_updates)
         
     def setup_ui(self):
         # Main frame
@@ -71,26 +104,27 @@ class TranslationApp:
         # Step 2: URL Selection
         ttk.Label(main_frame, text="Step 2: Select URLs to Translate", font=("Arial", 12, "bold")).grid(row=4, column=0, columnspan=2, sticky=tk.W, pady=(0, 10))
         
-        # URL listbox with scrollbar
-        list_frame = ttk.Frame(main_frame)
-        list_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
-        list_frame.columnconfigure(0, weight=1)
-        list_frame.rowconfigure(0, weight=1)
-        
-        self.url_listbox = tk.Listbox(list_frame, selectmode=tk.MULTIPLE, height=12)
-        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.url_listbox.yview)
-        self.url_listbox.configure(yscrollcommand=scrollbar.set)
+        # URL list (only the visible rows are drawn, so large sitemaps stay responsive)
+        self.url_list = URLList(main_frame, height=12, on_change=self.update_url_count)
+        self.url_list.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         
-        self.url_listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        
-        # URL selection buttons
+        # URL filter and selection buttons
         url_button_frame = ttk.Frame(main_frame)
-        url_button_frame.grid(row=6, column=0, columnspan=2, sticky=tk.W, pady=(0, 10))
-        
-        ttk.Button(url_button_frame, text="Select All", command=self.select_all_urls).grid(row=0, column=0, padx=(0, 5))
-        ttk.Button(url_button_frame, text="Select None", command=self.select_none_urls).grid(row=0, column=1, padx=(0, 5))
-        ttk.Label(url_button_frame, text="(Hold Ctrl/Cmd to select multiple individually)", font=("Arial", 8)).grid(row=0, column=2, padx=(10, 0))
+        url_button_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        url_button_frame.columnconfigure(6, weight=1)
+        
+        ttk.Label(url_button_frame, text="Filter:").grid(row=0, column=0, padx=(0, 5))
+        # Show an invalid regular expression in red
+        ttk.Style().map("URLFilter.TEntry", foreground=[('invalid', 'red')])
+        self.url_filter_entry = ttk.Entry(url_button_frame, textvariable=self.url_filter, width=30, style="URLFilter.TEntry")
+        self.url_filter_entry.grid(row=0, column=1, padx=(0, 5))
+        self.url_filter.trace('w', self.on_url_filter_change)
+        ttk.Checkbutton(url_button_frame, text="Regex", variable=self.url_filter_regex, command=self.on_url_filter_change).grid(row=0, column=2, padx=(0, 10))
+        ttk.Button(url_button_frame, text="Select All", command=self.select_all_urls).grid(row=0, column=3, padx=(0, 5))
+        ttk.Button(url_button_frame, text="Select None", command=self.select_none_urls).grid(row=0, column=4, padx=(0, 5))
+        ttk.Label(url_button_frame, text="(Click to toggle, Shift+click for a range; Select All/None apply to the filtered URLs)", font=("Arial", 8)).grid(row=0, column=5, padx=(10, 0))
+        self.url_count_label = ttk.Label(url_button_frame, text="", foreground="gray")
+        self.url_count_label.grid(row=0, column=6, sticky=tk.E)
         
         # Step 3: Document Settings
         ttk.Label(main_frame, text="Step 3: Document Settings", font=("Arial", 12, "bold")).grid(row=7, column=0, columnspan=2, sticky=tk.W, pady=(20, 10))
@@ -101,6 +135,7 @@ class TranslationApp:
         
         ttk.Label(doc_settings_frame, text="Company Name:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
         ttk.Entry(doc_settings_frame, textvariable=self.company_name, width=30).grid(row=0, column=1, sticky=tk.W, pady=(0, 5))
+        ttk.Checkbutton(doc_settings_frame, text="Reuse unchanged pages from the last run for this company", variable=self.incremental).grid(row=1, column=1, sticky=tk.W)
         
         # Step 4: Language Settings (only if API key available)
         self.language_frame = ttk.LabelFrame(main_frame, text="Language Settings (Translation Mode)")
@@ -163,6 +198,10 @@ class TranslationApp:
         self.current_operation_label = ttk.Label(self.progress_frame, text="", foreground="green")
         self.current_operation_label.grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=(0, 0))
         
+        # Status line 4: Throughput and ETA
+        self.rate_label = ttk.Label(self.progress_frame, text="", foreground="gray")
+        self.rate_label.grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=(2, 0))
+        
         # Button frame for Start and New buttons
         self.button_frame = ttk.Frame(main_frame)
         self.button_frame.grid(row=12, column=0, columnspan=2, pady=(0, 10))
@@ -182,7 +221,7 @@ class TranslationApp:
     def check_api_key_status(self):
         """Check if API key is available and update UI accordingly"""
         try:
-            api_key = get_deepl_key()
+            api_key = get_deepl_key(self.root)
             self.has_api_key = bool(api_key)
         except:
             self.has_api_key = False
@@ -244,32 +283,85 @@ class TranslationApp:
             
         self.update_progress(0, "Fetching URLs...", "", "Connecting to sitemap...")
         
+        # A new fetch replaces the list; a fetch still running for the old one stops
+        self.fetch_id += 1
+        fetch_id = self.fetch_id
+        self.url_list.clear()
+        self.url_order = None
+        found = queue.Queue()
+        
+        # Ensure URL ends with /
+        url = self.base_url.get().strip()
+        if not url.endswith('/'):
+            url += '/'
+        blogs = 'yes' if self.include_blogs.get() else 'no'
+        
         def fetch_thread():
             try:
-                # Ensure URL ends with /
-                url = self.base_url.get().strip()
-                if not url.endswith('/'):
-                    url += '/'
-                
-                self.all_urls = list(get_all_urls(url, 'yes' if self.include_blogs.get() else 'no'))
-                
-                # Update UI in main thread
-                self.root.after(0, self.update_url_list)
+                from scraper import get_root_sitemaps, crawl_sitemaps, sitemap_order
                 
+                roots = get_root_sitemaps(url)
+                parsed = {}
+                for sitemap_url, children, entries in crawl_sitemaps(roots, blogs):
+                    if fetch_id != self.fetch_id:
+                        return
+                    parsed[sitemap_url] = (children, entries)
+                    if entries:
+                        found.put(entries)
+                found.put(('done', sitemap_order(roots, parsed)))
             except Exception as e:
-                error_msg = f"Error fetching URLs: {str(e)}"
-                self.root.after(0, lambda: self.show_error(error_msg))
+                found.put(('error', f"Error fetching URLs: {str(e)}"))
         
         threading.Thread(target=fetch_thread, daemon=True).start()
+        self.root.after(URL_LIST_UPDATE_MS, lambda: self.update_url_list(fetch_id, found))
     
-    def update_url_list(self):
-        """Update the URL listbox with fetched URLs"""
-        self.url_listbox.delete(0, tk.END)
-        for i, url in enumerate(self.all_urls):
-            self.url_listbox.insert(tk.END, f"{i+1}. {url}")
+    def update_url_list(self, fetch_id, found):
+        """Add the URLs found since the last update to the list, in one chunk"""
+        if fetch_id != self.fetch_id:
+            return
         
-        self.update_progress(100, f"Found {len(self.all_urls)} URLs", "", "")
-        self.clear_progress_details()
+        chunk = []
+        finished = None
+        while finished is None:
+            try:
+                item = found.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple):
+                finished = item
+            else:
+                chunk.extend(item)
+        if chunk:
+            self.url_list.append(chunk)
+        
+        if finished is None:
+            self.update_progress(0, f"Fetching URLs... {len(self.url_list.urls)} found so far", "", "Reading sitemaps...")
+            self.root.after(URL_LIST_UPDATE_MS, lambda: self.update_url_list(fetch_id, found))
+        elif finished[0] == 'error':
+            self.show_error(finished[1])
+        else:
+            # Selected URLs are processed in sitemap order, whatever order they arrived in
+            self.url_order = {entry.address: position for position, entry in enumerate(finished[1])}
+            self.update_progress(100, f"Found {len(self.url_list.urls)} URLs", "", "")
+            self.clear_progress_details()
+    
+    def update_url_count(self):
+        """Show how many URLs are listed, shown by the filter and selected"""
+        url_list = self.url_list
+        if not url_list.urls:
+            text = ""
+        elif len(url_list.shown) == len(url_list.urls):
+            text = f"{len(url_list.selected)} of {len(url_list.urls)} selected"
+        else:
+            text = f"{len(url_list.shown)} of {len(url_list.urls)} shown, {len(url_list.selected)} selected"
+        self.url_count_label.config(text=text)
+    
+    def on_url_filter_change(self, *args):
+        """Called when the URL filter text or regex option changes"""
+        if self.url_list.set_filter(self.url_filter.get(), self.url_filter_regex.get()):
+            self.url_filter_entry.state(['!invalid'])
+        else:
+            self.url_filter_entry.state(['invalid'])
     
     def start_translation(self):
         """Start the translation process"""
@@ -283,28 +375,26 @@ class TranslationApp:
             return
             
         # Get selected URLs
-        selected_indices = self.url_listbox.curselection()
-        if not selected_indices:
+        selected_urls = self.url_list.get_selected()
+        if not selected_urls:
             messagebox.showerror("Error", "Please select at least one URL to process")
             return
+        if self.url_order is not None:
+            selected_urls.sort(key=lambda url: self.url_order.get(url.address, len(self.url_order)))
             
         # Get target languages (optional - if none selected, will do content scraping only)
         target_langs = [lang for lang, var in self.target_vars.items() if var.get()]
-            
-        # Get selected URLs
-        selected_urls = [self.all_urls[i] for i in selected_indices]
         
-        # Start translation in background thread
+        # Start translation in background thread, with fresh throughput figures
+        self.progress_view = ProgressView()
         self.update_progress(0, "Starting translation...", "", "Initializing...")
         
         def translation_thread():
             try:
-                # Create URL objects (simplified for standalone app)
-                class SimpleURL:
-                    def __init__(self, address):
-                        self.address = address
+                from document_creator import create_translation_doc, create_content_only_doc
                 
-                url_objects = [SimpleURL(url) for url in selected_urls]
+                # Sitemap entries carry the page address the document builders need
+                url_objects = selected_urls
                 
                 # Update status to show we're starting
                 self.update_progress(5, "Starting translation...", "", "Preparing output directory...")
@@ -337,27 +427,29 @@ class TranslationApp:
                     
                     if has_api_key and target_langs:
                         # Start translation (API key available AND target languages selected)
-                        create_translation_doc(
+                        output_paths = create_translation_doc(
                             self.company_name.get().strip(),
                             url_objects,
                             self.get_source_language_code(),
                             target_langs,
-                            self.update_progress
+                            incremental=self.incremental.get(),
+                            progress_bus=self.progress_bus
                         )
                     else:
                         # Create content-only document (no API key OR no target languages selected)
-                        create_content_only_doc(
+                        output_paths = create_content_only_doc(
                             self.company_name.get().strip(),
                             url_objects,
                             self.get_source_language_code(),
-                            self.update_progress
+                            incremental=self.incremental.get(),
+                            progress_bus=self.progress_bus
                         )
                 finally:
                     # Change back to original directory
                     os.chdir(original_cwd)
                 
                 # Update UI when complete
-                self.root.after(0, self.translation_complete)
+                self.root.after(0, lambda: self.translation_complete(output_paths))
                 
             except Exception as e:
                 error_msg = f"Translation error: {str(e)}"
@@ -365,8 +457,11 @@ class TranslationApp:
         
         threading.Thread(target=translation_thread, daemon=True).start()
     
-    def translation_complete(self):
-        """Handle translation completion"""
+    def translation_complete(self, output_paths):
+        """Handle translation completion (output_paths are the files written, relative to the output directory)"""
+        # Show the run's last updates, then stop showing its throughput
+        self.render_progress()
+        self.progress_view = ProgressView()
         self.update_progress(100, "Processing complete!", "", "")
         self.clear_progress_details()
         
@@ -388,12 +483,17 @@ class TranslationApp:
         # Check if target languages were selected
         target_langs = [lang for lang, var in self.target_vars.items() if var.get()]
         
+        # Every output format selected in the settings was written
+        file_paths = [os.path.join(output_dir, path) for path in output_paths]
+        file_path = file_paths[0]
+        saved = "\n".join(file_paths[:MAX_LISTED_FILES])
+        if len(file_paths) > MAX_LISTED_FILES:
+            # Sharded workbooks can add dozens of files
+            saved += f"\n...and {len(file_paths) - MAX_LISTED_FILES} more"
         if has_api_key and target_langs:
-            file_path = os.path.join(output_dir, f"{self.company_name.get()}.xlsx")
-            message = f"Translation complete! File saved as:\n{file_path}\n\nWould you like to open the file location?"
+            message = f"Translation complete! File saved as:\n{saved}\n\nWould you like to open the file location?"
         else:
-            file_path = os.path.join(output_dir, f"{self.company_name.get()}_content_only.xlsx")
-            message = f"Content extraction complete! File saved as:\n{file_path}\n\nWould you like to open the file location?"
+            message = f"Content extraction complete! File saved as:\n{saved}\n\nWould you like to open the file location?"
         
         # Ask if user wants to open the file
         result = messagebox.askyesno("Success", message)
@@ -404,26 +504,31 @@ class TranslationApp:
                 os.system(f'open "{output_dir}"')
     
     def update_progress(self, percent, status="", current_url="", operation=""):
-        """Update the multi-level progress display"""
-        def update_ui():
-            self.progress['value'] = percent
-            self.progress_percent.config(text=f"{int(percent)}%")
-            if status:
-                self.status_label.config(text=status)
-            if current_url:
-                self.current_url_label.config(text=f"Current: {current_url}")
-            if operation:
-                self.current_operation_label.config(text=operation)
-        
-        self.root.after(0, update_ui)
+        """Update the multi-level progress display (from any thread)"""
+        self.progress_reporter(percent, status, current_url, operation)
     
     def clear_progress_details(self):
-        """Clear the detailed progress information"""
-        def clear_ui():
-            self.current_url_label.config(text="")
-            self.current_operation_label.config(text="")
-        
-        self.root.after(0, clear_ui)
+        """Clear the detailed progress information (from any thread)"""
+        self.progress_reporter.clear()
+    
+    def render_progress_loop(self):
+        """Show the progress events published since the last frame, then schedule the next frame"""
+        self.render_progress()
+        self.root.after(PROGRESS_FRAME_MS, self.render_progress_loop)
+    
+    def render_progress(self):
+        """Fold pending progress events into the view and show the latest state"""
+        view = self.progress_view
+        view.update(self.progress_bus.drain())
+        if view.changed:
+            view.changed = False
+            self.progress['value'] = view.percent
+            self.progress_percent.config(text=f"{int(view.percent)}%")
+            self.status_label.config(text=view.status)
+            self.current_url_label.config(text=f"Current: {view.url}" if view.url else "")
+            self.current_operation_label.config(text=view.operation)
+        # Rates are recomputed every frame so they fall off when a run stalls
+        self.rate_label.config(text=view.describe_rate())
     
     def get_source_language_code(self):
         """Extract language code from the source language selection"""
@@ -435,10 +540,12 @@ class TranslationApp:
     
     def show_error(self, message):
         """Show error message and reset UI"""
-        self.progress['value'] = 0
-        self.progress_percent.config(text="0%")
-        self.status_label.config(text="Error occurred")
+        # Drop updates the failed run published after the last frame
+        self.progress_bus.drain()
+        self.progress_view = ProgressView()
+        self.update_progress(0, "Error occurred")
         self.clear_progress_details()
+        self.render_progress()
         messagebox.showerror("Error", message)
     
     def change_api_key(self):
@@ -462,9 +569,12 @@ class TranslationApp:
         
         # Save new key to config
         if save_api_key(new_key):
-            # Clear cached key and translator to force reload
+            # Clear cached key and translator to force reload (the translator
+            # module is only loaded once a translation has run)
             clear_cached_key()
-            clear_translator()
+            translator = sys.modules.get('translator')
+            if translator is not None:
+                translator.clear_translator()
             
             # Update UI state
             self.check_api_key_status()
@@ -478,16 +588,19 @@ class TranslationApp:
         # Clear all input fields
         self.base_url.set("")
         self.company_name.set("")
+        self.incremental.set(False)
         self.source_language.set("EN-US - English (US)")
         
         # Uncheck all target language checkboxes
         for var in self.target_vars.values():
             var.set(False)
         
-        # Clear URL list
-        self.url_listbox.delete(0, tk.END)
-        self.all_urls = []
-        self.selected_urls = []
+        # Clear URL list (and stop a fetch still running)
+        self.fetch_id += 1
+        self.url_list.clear()
+        self.url_order = None
+        self.url_filter.set("")
+        self.url_filter_regex.set(False)
         
         # Reset status
         self.update_progress(0, "Ready to start", "", "")
@@ -497,12 +610,12 @@ class TranslationApp:
         self.root.focus_set()
     
     def select_all_urls(self):
-        """Select all URLs in the listbox"""
-        self.url_listbox.select_set(0, tk.END)
+        """Select all URLs matching the filter"""
+        self.url_list.select_shown()
     
     def select_none_urls(self):
-        """Deselect all URLs in the listbox"""
-        self.url_listbox.select_clear(0, tk.END)
+        """Deselect all URLs matching the filter"""
+        self.url_list.select_none_shown()
 
 
 def main():
@@ -512,4 +625,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Needed for extraction worker processes in the frozen app
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
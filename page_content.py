@@ -0,0 +1,50 @@
+"""Compact model of an extracted page, passed from extraction to every later stage
+
+Extraction keeps nothing of the parsed document but these strings: the lxml
+tree is dropped as soon as extract_page() returns, so the pages waiting in
+the pipeline (or kept for common string detection) cost a few kilobytes
+each instead of a full DOM.
+"""
+
+from collections import namedtuple
+
+
+class Segment(namedtuple('Segment', ['text', 'level'])):
+    """A piece of ordered content: its text and heading level (1-6 for h1-h6, 0 otherwise)"""
+
+    __slots__ = ()
+
+
+class PageContent:
+    """The title, meta description and ordered content segments of one page
+
+    meta_description is "None" when the page has none, as in the workbooks.
+    segments is a tuple of Segment in document order.
+    """
+
+    __slots__ = ('url', 'title', 'meta_description', 'segments')
+
+    def __init__(self, url=None, title='', meta_description="None", segments=()):
+        self.url = url
+        self.title = title
+        self.meta_description = meta_description
+        self.segments = tuple(segments)
+
+    def to_dict(self):
+        """Get a JSON-serializable dict of the page (without its URL)"""
+        return {
+            'title': self.title,
+            'meta_description': self.meta_description,
+            'segments': [list(segment) for segment in self.segments],
+        }
+
+    @classmethod
+    def from_dict(cls, data, url=None):
+        """Rebuild a page from to_dict()
+
+        Pages stored before heading levels were kept have True/False in
+        place of the level; headings among them come back as level 1.
+        """
+        return cls(url, data['title'], data['meta_description'], [
+            Segment(text, int(level)) for text, level in data['segments']
+        ])
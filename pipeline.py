@@ -0,0 +1,184 @@
+"""Staged asyncio pipeline: fetch -> extract -> translate -> write
+
+Each stage runs its blocking work (HTTP requests, lxml parsing, DeepL
+calls, xlsx writes) in its own thread pool, and the stages are connected
+by bounded asyncio queues. Pages are written strictly in URL order by a
+single writer; a window of admitted-but-unwritten pages provides
+backpressure so memory stays bounded however far ahead fetching gets.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from config import get_setting
+from http_client import get_session
+from tracing import span
+
+
+class PageJob:
+    """One URL travelling through the pipeline"""
+
+    __slots__ = ('index', 'url', 'fetched', 'page', 'translated', 'error')
+
+    def __init__(self, index, url, page=None, error=None):
+        self.index = index
+        self.url = url
+        self.fetched = None
+        self.page = page
+        self.translated = None
+        self.error = error
+
+
+def _timed(stage, job, func, *args):
+    """Run one stage of one page inside a trace span"""
+    with span(stage, url=getattr(job.url, 'address', job.url)):
+        return func(*args)
+
+
+async def _run_stage(queue, out_queue, pool, func):
+    """Worker loop for a middle stage: take jobs, run func in the pool, pass them on"""
+    loop = asyncio.get_running_loop()
+    while True:
+        job = await queue.get()
+        if job.error is None:
+            try:
+                await func(loop, pool, job)
+            except Exception as e:
+                job.error = e
+        await out_queue.put(job)
+
+
+async def _pipeline(urls, write, fetch, extract, translate, pages, skip, max_workers, extract_workers, translate_workers, window_size):
+    loop = asyncio.get_running_loop()
+    total = len(urls)
+    counts = {'started': 0, 'fetched': 0, 'extracted': 0, 'translated': 0, 'written': 0}
+
+    fetch_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+    extract_pool = ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix='extract')
+    translate_pool = ThreadPoolExecutor(max_workers=translate_workers, thread_name_prefix='translate')
+    write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='write')
+
+    extract_queue = asyncio.Queue(maxsize=window_size)
+    translate_queue = asyncio.Queue(maxsize=window_size)
+    write_queue = asyncio.Queue(maxsize=window_size)
+    # Pages admitted into the pipeline but not yet written
+    window = asyncio.Semaphore(window_size)
+    next_job = iter(range(total))
+
+    async def fetcher():
+        while True:
+            await window.acquire()
+            index = next(next_job, None)
+            if index is None:
+                window.release()
+                return
+            if index in skip:
+                # Finished in an earlier run: straight to the writer
+                for stage in ('started', 'fetched', 'extracted', 'translated'):
+                    counts[stage] += 1
+                await write_queue.put(PageJob(index, urls[index]))
+                continue
+            if pages is not None:
+                # Already fetched and extracted in an earlier pass
+                page, error = pages[index]
+                for stage in ('started', 'fetched', 'extracted'):
+                    counts[stage] += 1
+                await translate_queue.put(PageJob(index, urls[index], page, error))
+                continue
+            job = PageJob(index, urls[index])
+            counts['started'] += 1
+            try:
+                job.fetched = await loop.run_in_executor(fetch_pool, _timed, 'fetch', job, fetch, job.url)
+            except Exception as e:
+                job.error = e
+            counts['fetched'] += 1
+            await extract_queue.put(job)
+
+    async def run_extract(loop, pool, job):
+        job.page = await loop.run_in_executor(pool, _timed, 'extract', job, extract, job.url, job.fetched)
+        # The raw HTML isn't needed past this point
+        job.fetched = None
+        counts['extracted'] += 1
+
+    async def run_translate(loop, pool, job):
+        if translate is not None:
+            job.translated = await loop.run_in_executor(pool, _timed, 'translate', job, translate, job.url, job.page)
+        counts['translated'] += 1
+
+    async def writer():
+        pending = {}
+        next_index = 0
+        while next_index < total:
+            job = await write_queue.get()
+            pending[job.index] = job
+            while next_index in pending:
+                job = pending.pop(next_index)
+                counts['written'] += 1
+                # in_flight: requests currently being made
+                snapshot = dict(counts, total=total, in_flight=counts['started'] - counts['fetched'])
+                await loop.run_in_executor(
+                    write_pool, _timed, 'write', job, write,
+                    job.index, job.url, job.page, job.translated, job.error, snapshot,
+                )
+                next_index += 1
+                window.release()
+
+    fetch_workers = 1 if pages is not None else max_workers
+    tasks = [asyncio.create_task(fetcher()) for _ in range(fetch_workers)]
+    tasks += [
+        asyncio.create_task(_run_stage(extract_queue, translate_queue, extract_pool, run_extract))
+        for _ in range(extract_workers)
+    ]
+    tasks += [
+        asyncio.create_task(_run_stage(translate_queue, write_queue, translate_pool, run_translate))
+        for _ in range(translate_workers)
+    ]
+    try:
+        await writer()
+    finally:
+        # Cancelling a task also cancels the executor future it is waiting
+        # on, so work that hasn't started yet never runs (shutdown's
+        # cancel_futures needs Python 3.9)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for pool in (fetch_pool, extract_pool, translate_pool, write_pool):
+            pool.shutdown(wait=True)
+
+
+def run_pipeline(urls, write, fetch=None, extract=None, translate=None, pages=None, skip=None, max_workers=None, translate_workers=None):
+    """Push every URL through the pipeline and block until the last page is written
+
+    fetch(url) -> fetched data, run in max_workers threads
+    extract(url, fetched) -> page, run in a small pool of parser threads (or
+    one thread per extraction process, see extractor.extract_content)
+    translate(url, page) -> translated data (optional), run in translate_workers threads
+    write(index, url, page, translated, error, counts) is called for every
+    URL in order, from a single thread. error is the exception raised by an
+    earlier stage for that URL (None on success); raising from write stops
+    the whole pipeline.
+
+    Pass pages, a list of (page, error) aligned with urls, to skip the fetch
+    and extract stages for pages that were already extracted, and skip, a set
+    of indexes, to send those pages straight to write (with page and
+    translated None), e.g. when they were restored from a checkpoint.
+    """
+    if max_workers is None:
+        max_workers = get_setting('max_workers')
+    max_workers = max(1, int(max_workers))
+    if translate_workers is None:
+        translate_workers = get_setting('translate_workers')
+    translate_workers = max(1, int(translate_workers))
+    # With extract_processes set, each extract thread just waits on a worker process
+    extract_workers = max(1, min(4, os.cpu_count() or 1), int(get_setting('extract_processes') or 0))
+    window_size = max_workers * 2
+    if not urls:
+        return
+    skip = skip or set()
+    if pages is None:
+        # Keep one pooled keep-alive connection per fetch worker
+        get_session(max_workers)
+    asyncio.run(_pipeline(
+        urls, write, fetch, extract, translate, pages, skip,
+        max_workers, extract_workers, translate_workers, window_size,
+    ))
@@ -0,0 +1,218 @@
+"""Thread-safe progress events, coalesced for display
+
+Workers publish small ProgressEvent objects on a ProgressBus from any
+thread; publishing only appends to a deque. Displays don't react to every
+event: the GUI and the CLI drain the bus at a fixed rate and fold the
+events into a ProgressView, which keeps the latest status and works out
+throughput (pages/s, segments/s) and an ETA. Subscribers (the CLI's log
+file, the old progress_callback functions) are called for every event in
+the publishing thread, so they should be quick.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+
+# Throughput is measured over this many seconds of recent events
+RATE_WINDOW_SECONDS = 10
+
+logger = logging.getLogger('progress')
+
+
+class ProgressEvent:
+    """One progress update from a run
+
+    stage is what happened ('fetch', 'extract', 'write', 'collect', or
+    None for overall status updates). percent, status, url and operation
+    are None when unchanged. counts is the pipeline's counts dict (pages
+    started, fetched, translated, written, total, in flight) at the time.
+    """
+
+    __slots__ = ('run', 'stage', 'percent', 'status', 'url', 'operation', 'counts', 'segments', 'bytes', 'time')
+
+    def __init__(self, run, stage=None, percent=None, status=None, url=None, operation=None,
+                 counts=None, segments=0, bytes=0):
+        self.run = run
+        self.stage = stage
+        self.percent = percent
+        self.status = status
+        self.url = url
+        self.operation = operation
+        self.counts = counts
+        self.segments = segments
+        self.bytes = bytes
+        self.time = time.monotonic()
+
+
+class ProgressBus:
+    """Queue of progress events shared by the threads of one or more runs
+
+    With keep_events=False events only go to subscribers, for runs that
+    nobody drains.
+    """
+
+    def __init__(self, keep_events=True):
+        self._lock = threading.Lock()
+        self._events = deque()
+        self._keep_events = keep_events
+        self._subscribers = ()
+
+    def publish(self, event):
+        """Add an event (from any thread)"""
+        if self._keep_events:
+            with self._lock:
+                self._events.append(event)
+        for callback in self._subscribers:
+            callback(event)
+
+    def drain(self):
+        """Take every event published since the last drain"""
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def subscribe(self, callback):
+        """Call callback(event) for every event as it is published"""
+        with self._lock:
+            self._subscribers = self._subscribers + (callback,)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = tuple(subscriber for subscriber in self._subscribers if subscriber is not callback)
+
+
+class ProgressReporter:
+    """Publishes one run's events, and can be called like a progress_callback
+
+    reporter(percent, status, current_url, operation) publishes an overall
+    status update (empty strings leave that line unchanged), and
+    reporter.event(stage, url, ...) a worker's progress. An old-style
+    progress_callback(percent, status, url, operation) is passed every
+    overall status update of this run until close().
+    """
+
+    def __init__(self, bus, run, progress_callback=None):
+        self.bus = bus
+        self.run = run
+        self._forward = None
+        if progress_callback:
+            def forward(event):
+                if event.run == run and event.percent is not None:
+                    progress_callback(event.percent, event.status or "", event.url or "", event.operation or "")
+            self._forward = forward
+            bus.subscribe(forward)
+
+    def __call__(self, percent, status="", current_url="", operation="", counts=None):
+        self.bus.publish(ProgressEvent(
+            self.run, None, percent, status or None, current_url or None, operation or None, counts,
+        ))
+
+    def event(self, stage, url=None, counts=None, segments=0, bytes=0):
+        self.bus.publish(ProgressEvent(self.run, stage, url=url, counts=counts, segments=segments, bytes=bytes))
+
+    def clear(self):
+        """Clear the current URL and operation lines"""
+        self.bus.publish(ProgressEvent(self.run, 'clear'))
+
+    def close(self):
+        """Stop passing events to the progress_callback"""
+        if self._forward is not None:
+            self.bus.unsubscribe(self._forward)
+            self._forward = None
+
+
+def log_event(event):
+    """Subscriber logging every event to the 'progress' logger"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    parts = [f"[{event.run}]", event.stage or 'status']
+    if event.percent is not None:
+        parts.append(f"{int(event.percent)}%")
+    for text in (event.status, event.url, event.operation):
+        if text:
+            parts.append(text)
+    if event.segments:
+        parts.append(f"segments={event.segments}")
+    if event.bytes:
+        parts.append(f"bytes={event.bytes}")
+    if event.counts:
+        parts.append(" ".join(f"{name}={value}" for name, value in event.counts.items()))
+    logger.info(" ".join(parts))
+
+
+class ProgressView:
+    """Latest state of one run, folded from its events"""
+
+    def __init__(self):
+        self.percent = 0
+        self.status = ""
+        self.url = ""
+        self.operation = ""
+        self.counts = None
+        self.segments = 0
+        self.bytes = 0
+        self.pages = 0
+        self._samples = deque()  # (time, pages, segments)
+        self.changed = False
+
+    def update(self, events):
+        """Fold a batch of events into the view"""
+        if not events:
+            return
+        for event in events:
+            self.changed = True
+            if event.stage == 'clear':
+                self.url = ""
+                self.operation = ""
+                continue
+            if event.percent is not None:
+                self.percent = event.percent
+            if event.status is not None:
+                self.status = event.status
+            if event.url is not None:
+                self.url = event.url
+            if event.operation is not None:
+                self.operation = event.operation
+            if event.counts is not None:
+                if self.counts is not None and event.counts['written'] < self.counts['written']:
+                    # A new pass over the pages (after collecting them up front)
+                    self._samples.clear()
+                self.counts = event.counts
+            if event.stage in ('write', 'collect'):
+                self.pages += 1
+            self.segments += event.segments
+            self.bytes += event.bytes
+        self._samples.append((events[-1].time, self.pages, self.segments))
+        while len(self._samples) > 2 and self._samples[-1][0] - self._samples[0][0] > RATE_WINDOW_SECONDS:
+            self._samples.popleft()
+
+    def rates(self):
+        """Get (pages per second, segments per second) over the last few seconds"""
+        if len(self._samples) < 2:
+            return 0.0, 0.0
+        (start, pages, segments), (_, last_pages, last_segments) = self._samples[0], self._samples[-1]
+        # Measured up to now, so the rates fall off when the run stalls
+        elapsed = max(time.monotonic() - start, 1e-6)
+        return (last_pages - pages) / elapsed, (last_segments - segments) / elapsed
+
+    def eta(self):
+        """Estimate the seconds left in the current pass over the pages, or None"""
+        pages_per_second, _ = self.rates()
+        if not self.counts or pages_per_second <= 0:
+            return None
+        return max(0, self.counts['total'] - self.counts['written']) / pages_per_second
+
+    def describe_rate(self):
+        """Format throughput and ETA, e.g. '4.2 pages/s, 310 segments/s, ETA 1:05'"""
+        pages_per_second, segments_per_second = self.rates()
+        if pages_per_second <= 0:
+            return ""
+        text = f"{pages_per_second:.1f} pages/s, {segments_per_second:.0f} segments/s"
+        eta = self.eta()
+        if eta is not None:
+            minutes, seconds = divmod(int(eta + 0.5), 60)
+            text += f", ETA {minutes}:{seconds:02d}"
+        return text
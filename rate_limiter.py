@@ -0,0 +1,195 @@
+"""Adaptive rate limiting and quota tracking for DeepL requests"""
+
+import random
+import threading
+import time
+import deepl
+from config import get_setting
+
+
+# Never slow down below one request every two seconds
+MIN_RATE = 0.5
+# Requests per second added back after each window of successful requests
+RATE_STEP = 0.5
+# Attempts per request before giving up on 429s, 5xx and dropped connections
+MAX_ATTEMPTS = 6
+MAX_BACKOFF = 60
+# How often the account's character usage is refreshed from DeepL
+QUOTA_CHECK_SECONDS = 60
+QUOTA_CHECK_CHARACTERS = 100000
+
+
+class DeepLLimiter:
+    """Token bucket and AIMD concurrency window shared by every DeepL request
+
+    Requests start at deepl_requests_per_second with up to
+    deepl_max_concurrency in flight. A 429 halves both and pauses every
+    thread for an exponential backoff with jitter; each window of successful
+    requests adds one slot and RATE_STEP requests per second back, up to the
+    configured limits. The DeepL client's own retries are turned off (see
+    translator.get_translator) so every 429 is seen here.
+
+    The account's character usage is read with get_usage() before the first
+    request and then periodically, and a request that would go over the
+    quota raises QuotaExceededException before it is sent.
+    """
+
+    def __init__(self, rate=None, max_concurrency=None):
+        self.max_rate = max(MIN_RATE, float(rate or get_setting('deepl_requests_per_second')))
+        self.max_concurrency = max(1, int(max_concurrency or get_setting('deepl_max_concurrency')))
+        self.rate = self.max_rate
+        self.concurrency = self.max_concurrency
+        self._cond = threading.Condition()
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+
+        self._quota_lock = threading.Lock()
+        self._quota_remaining = None  # characters; None when unknown or unlimited
+        self._characters_since_check = 0
+        self._last_check = None
+
+        self.requests = 0
+        self.throttled = 0
+        self.characters = 0
+
+    def _refill(self, now):
+        # Allow a burst of up to one second's worth of requests
+        capacity = max(1.0, self.rate)
+        self._tokens = min(capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._in_flight >= self.concurrency:
+                        wait = None  # until a request finishes
+                    elif self._tokens >= 1:
+                        self._tokens -= 1
+                        self._in_flight += 1
+                        self.requests += 1
+                        return
+                    else:
+                        wait = (1 - self._tokens) / self.rate
+                self._cond.wait(wait)
+
+    def release(self, success=False, throttled=False, backoff=None):
+        """Record the outcome of a request sent after acquire()
+
+        success=True counts towards widening the window again,
+        throttled=True halves the request rate and concurrency, and backoff
+        pauses every thread for that many seconds.
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self._successes = 0
+                self.concurrency = max(1, self.concurrency // 2)
+                self.rate = max(MIN_RATE, self.rate / 2)
+                self._tokens = min(self._tokens, 0.0)
+            elif success:
+                self._successes += 1
+                if self._successes >= self.concurrency:
+                    self._successes = 0
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                    self.rate = min(self.max_rate, self.rate + RATE_STEP)
+            if backoff:
+                self._paused_until = max(self._paused_until, time.monotonic() + backoff)
+            self._cond.notify_all()
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0.5, 1.0) * min(MAX_BACKOFF, 2 ** attempt)
+
+    def check_quota(self, translator):
+        """Refresh the remaining character quota from DeepL, returning it (None if unlimited)"""
+        try:
+            usage = translator.get_usage()
+        except deepl.DeepLException as e:
+            # Not fatal: keep counting against the last known quota
+            print(f"Couldn't check DeepL usage: {e}")
+            with self._quota_lock:
+                self._last_check = time.monotonic()
+            return self._quota_remaining
+        character = usage.character
+        with self._quota_lock:
+            if character.valid:
+                self._quota_remaining = max(0, character.limit - character.count)
+            else:
+                self._quota_remaining = None
+            self._characters_since_check = 0
+            self._last_check = time.monotonic()
+            return self._quota_remaining
+
+    def reserve(self, translator, characters):
+        """Count characters against the quota, raising QuotaExceededException if they don't fit"""
+        with self._quota_lock:
+            due = (
+                self._last_check is None
+                or time.monotonic() - self._last_check >= QUOTA_CHECK_SECONDS
+                or self._characters_since_check >= QUOTA_CHECK_CHARACTERS
+            )
+        if due:
+            self.check_quota(translator)
+        with self._quota_lock:
+            if self._quota_remaining is not None:
+                available = self._quota_remaining - self._characters_since_check
+                if characters > available:
+                    raise deepl.QuotaExceededException(
+                        f"DeepL character quota would be exceeded: {characters} characters to translate, "
+                        f"{max(0, available)} left this billing period"
+                    )
+            self._characters_since_check += characters
+            self.characters += characters
+
+    def call(self, translator, func, characters=0):
+        """Run func() as one DeepL request, retrying with backoff on 429s and server errors"""
+        self.reserve(translator, characters)
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = func()
+            except deepl.TooManyRequestsException:
+                if attempt + 1 >= MAX_ATTEMPTS:
+                    self.release(throttled=True)
+                    raise
+                self.release(throttled=True, backoff=self._backoff(attempt))
+            except deepl.QuotaExceededException:
+                with self._quota_lock:
+                    self._quota_remaining = 0
+                self.release()
+                raise
+            except deepl.DeepLException as e:
+                retry = e.should_retry or (e.http_status_code or 0) >= 500
+                if not retry or attempt + 1 >= MAX_ATTEMPTS:
+                    self.release()
+                    raise
+                self.release(backoff=self._backoff(attempt))
+            except BaseException:
+                self.release()
+                raise
+            else:
+                self.release(success=True)
+                return result
+            attempt += 1
+
+    def stats(self):
+        """Get request counters for this limiter"""
+        with self._cond:
+            return {
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'characters': self.characters,
+                'rate': self.rate,
+                'concurrency': self.concurrency,
+                'quota_remaining': self._quota_remaining,
+            }
@@ -1,35 +1,242 @@
 """Web scraping and URL fetching functionality"""
 
+import gzip
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlparse
 import requests
-from bs4 import BeautifulSoup
-
-
-def get_all_urls(base_url, blogs):
-    """Fetch all URLs from website sitemap"""
-    resp = requests.get(base_url + 'sitemap.xml')
-    soup = BeautifulSoup(resp.content, 'xml')
-    site_maps = soup.findAll('sitemap')
-    
-    out = set()
-    print(f'{blogs}')
-    for site_map in site_maps:
-        map = site_map.find('loc').string
-        if map == (base_url + "post-sitemap.xml") and (blogs=='no'):
+from lxml import etree
+from config import get_setting
+from http_client import http_get, http_stream
+from tracing import span, count
+
+
+# A page listed in a sitemap, with the metadata the sitemap gave for it
+SitemapURL = namedtuple('SitemapURL', ['address', 'lastmod', 'priority', 'sitemap'])
+
+# Sitemap indexes nested deeper than this are ignored (guards against loops)
+MAX_SITEMAP_DEPTH = 5
+
+# Content types read as pages; responses without a Content-Type are read too
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+READ_CHUNK_BYTES = 64 * 1024
+
+# The max_page_mb setting in bytes (0: no cap), read on first use
+_max_page_bytes = None
+
+_xml_parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True, huge_tree=True)
+
+
+def get_robots_sitemaps(base_url):
+    """Read sitemap locations declared in robots.txt"""
+    try:
+        resp = http_get(urljoin(base_url, '/robots.txt'))
+    except requests.RequestException:
+        return []
+    if resp.status_code != 200:
+        return []
+    sitemaps = []
+    for line in resp.text.splitlines():
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'sitemap' and value.strip():
+            sitemaps.append(urljoin(base_url, value.strip()))
+    return sitemaps
+
+
+def is_blog_sitemap(sitemap_url):
+    """Check whether a child sitemap lists blog posts (post-sitemap.xml, post-sitemap2.xml, ...)"""
+    return os.path.basename(urlparse(sitemap_url).path).startswith('post-sitemap')
+
+
+def _child_text(element, name):
+    """Get the stripped text of a direct child element, ignoring XML namespaces"""
+    for child in element:
+        if isinstance(child.tag, str) and etree.QName(child).localname == name:
+            return (child.text or '').strip() or None
+    return None
+
+
+def parse_sitemap(content, sitemap_url):
+    """Parse a sitemap or sitemap index (plain or gzipped)
+
+    Returns (child_sitemaps, entries) where entries is a list of SitemapURL.
+    """
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.decompress(content)
+    root = etree.fromstring(content, _xml_parser) if content.strip() else None
+    if root is None:
+        return [], []
+
+    children = []
+    entries = []
+    for element in root:
+        if not isinstance(element.tag, str):
+            continue
+        loc = _child_text(element, 'loc')
+        if not loc:
             continue
-        else:
-            response = requests.get(map)
-            sitemap_soup = BeautifulSoup(response.content, 'xml')
-            urls = sitemap_soup.findAll('url')
-            for u in urls:
-                loc = u.find('loc').string
-                out.add(loc)
-    return out
-
-
-def fetch_and_parse(url):
-    """Fetch and parse HTML content from a URL"""
-    response = requests.get(url)
-    html_content = response.text
-    soup = BeautifulSoup(html_content, 'lxml')
-    return soup
+        kind = etree.QName(element).localname
+        if kind == 'sitemap':
+            children.append(loc)
+        elif kind == 'url':
+            priority = _child_text(element, 'priority')
+            try:
+                priority = float(priority) if priority is not None else None
+            except ValueError:
+                priority = None
+            entries.append(SitemapURL(loc, _child_text(element, 'lastmod'), priority, sitemap_url))
+    return children, entries
+
+
+def fetch_sitemap(sitemap_url):
+    """Fetch and parse one sitemap, returning ([], []) if it can't be read"""
+    try:
+        with span('sitemap', url=sitemap_url):
+            response = http_get(sitemap_url)
+            count('bytes_downloaded', len(response.content))
+            if response.status_code != 200:
+                print(f"Skipping sitemap {sitemap_url}: HTTP {response.status_code}")
+                return [], []
+            return parse_sitemap(response.content, sitemap_url)
+    except (requests.RequestException, OSError, etree.LxmlError) as e:
+        print(f"Skipping sitemap {sitemap_url}: {e}")
+        return [], []
+
+
+def get_root_sitemaps(base_url):
+    """Get the sitemaps to start from: those in robots.txt, then /sitemap.xml"""
+    return list(dict.fromkeys(get_robots_sitemaps(base_url) + [base_url + 'sitemap.xml']))
+
+
+def crawl_sitemaps(roots, blogs, max_workers=None):
+    """Fetch sitemaps, yielding (sitemap_url, children, entries) as each one is parsed
+
+    Nested sitemap indexes are followed, with child sitemaps fetched
+    concurrently as soon as their index has been parsed. Sitemaps come out
+    in the order they finish, each one once.
+    """
+    if max_workers is None:
+        max_workers = get_setting('max_workers')
+
+    queued = set(roots)
+    with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as executor:
+        pending = {executor.submit(fetch_sitemap, root): (root, 0) for root in roots}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    sitemap_url, depth = pending.pop(future)
+                    children, entries = future.result()
+                    if blogs == 'no':
+                        children = [child for child in children if not is_blog_sitemap(child)]
+                    if depth < MAX_SITEMAP_DEPTH:
+                        for child in children:
+                            if child not in queued:
+                                queued.add(child)
+                                pending[executor.submit(fetch_sitemap, child)] = (child, depth + 1)
+                    yield sitemap_url, children, entries
+        finally:
+            # The caller stopped early: don't start the sitemaps still queued
+            for future in pending:
+                future.cancel()
+
+
+def sitemap_order(roots, parsed):
+    """Flatten parsed sitemaps ({sitemap_url: (children, entries)}) into a list of SitemapURL
+
+    URLs are taken depth-first so they keep the order the sitemap index
+    lists them in, without duplicates.
+    """
+    out = {}
+    visited = set()
+
+    def collect(sitemap_url):
+        if sitemap_url in visited or sitemap_url not in parsed:
+            return
+        visited.add(sitemap_url)
+        children, entries = parsed[sitemap_url]
+        for entry in entries:
+            out.setdefault(entry.address, entry)
+        for child in children:
+            collect(child)
+
+    for root in roots:
+        collect(root)
+    return list(out.values())
+
+
+def get_all_urls(base_url, blogs, max_workers=None):
+    """Fetch all URLs from the website sitemaps
+
+    Sitemaps are found via robots.txt and /sitemap.xml, nested sitemap
+    indexes are followed, and child sitemaps are fetched concurrently.
+    Returns a list of SitemapURL in sitemap order, without duplicates.
+    """
+    roots = get_root_sitemaps(base_url)
+    parsed = {}
+    for sitemap_url, children, entries in crawl_sitemaps(roots, blogs, max_workers):
+        parsed[sitemap_url] = (children, entries)
+    return sitemap_order(roots, parsed)
+
+
+def parse_content_type(content_type):
+    """Split a Content-Type header into (media type, charset or None)"""
+    media_type, _, params = (content_type or '').partition(';')
+    charset = None
+    for param in params.split(';'):
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            charset = value.strip().strip('"\'') or None
+    return media_type.strip().lower(), charset
+
+
+def get_max_page_bytes():
+    """Get the largest page body to read, from the max_page_mb setting (0 for no cap)"""
+    global _max_page_bytes
+    if _max_page_bytes is None:
+        max_mb = get_setting('max_page_mb')
+        _max_page_bytes = int(max_mb * 1_000_000) if max_mb else 0
+    return _max_page_bytes
+
+
+def skip_page(url, reason):
+    """Report a sitemap entry that isn't read as a page, returning it as an empty page"""
+    print(f"Skipping {url}: {reason}")
+    count('pages_skipped')
+    return b'', None
+
+
+def read_page(response, url):
+    """Read the body of a response from http_stream() if it is HTML within the max_page_mb setting
+
+    Returns (content, encoding): the raw bytes and the charset declared in
+    the Content-Type header, or None to let the extractor find it in the
+    page itself. Anything else (PDFs, images, oversized pages) is left
+    unread for http_stream() to drop, the skip is printed and counted, and
+    (b'', None) is returned so the URL still gets its (empty) worksheet.
+    """
+    media_type, charset = parse_content_type(response.headers.get('Content-Type'))
+    if media_type and media_type not in HTML_CONTENT_TYPES:
+        return skip_page(url, f"{media_type} is not HTML")
+    max_bytes = get_max_page_bytes()
+    too_large = f"larger than {max_bytes / 1_000_000:g} MB"
+    length = response.headers.get('Content-Length', '')
+    if max_bytes and length.isdigit() and int(length) > max_bytes:
+        return skip_page(url, too_large)
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(READ_CHUNK_BYTES):
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            count('bytes_downloaded', size)
+            return skip_page(url, too_large)
+        chunks.append(chunk)
+    count('bytes_downloaded', size)
+    return b''.join(chunks), charset
+
 
+def fetch_content(url):
+    """Fetch the raw bytes of a page and its declared encoding (see read_page)"""
+    with http_stream(url) as response:
+        return read_page(response, url)
@@ -0,0 +1,46 @@
+"""Cross-page segment counting for boilerplate deduplication"""
+
+from page_content import Segment
+
+
+class SegmentStore:
+    """Counts how many pages each content segment appears on
+
+    Used to find boilerplate (navigation, footers, cookie banners, CTAs)
+    that repeats across the selected pages so it can be written and
+    translated once instead of on every page.
+    """
+
+    def __init__(self):
+        # text -> [page count, heading level]; dicts keep first-seen order
+        self._segments = {}
+        self.page_count = 0
+
+    def add_page(self, segments):
+        """Record the Segments of one page"""
+        self.page_count += 1
+        seen = set()
+        for text, level in segments:
+            if text in seen:
+                continue
+            seen.add(text)
+            entry = self._segments.get(text)
+            if entry is None:
+                self._segments[text] = [1, level]
+            else:
+                entry[0] += 1
+
+    def pages_with(self, text):
+        """Get the number of pages a segment appears on"""
+        entry = self._segments.get(text)
+        return entry[0] if entry else 0
+
+    def common_segments(self, min_pages):
+        """Get the Segments found on at least min_pages pages, in first-seen order"""
+        if not min_pages or min_pages < 2:
+            return []
+        return [
+            Segment(text, level)
+            for text, (pages, level) in self._segments.items()
+            if pages >= min_pages
+        ]
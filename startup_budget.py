@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Check how fast the GUI starts against a time budget
+
+Usage:
+    python startup_budget.py [--budget 1.5] [--runs 3] [--top 15]
+
+Reports the time from launching the app to its first window being shown
+(median of several fresh interpreter starts) and the import time of the
+slowest modules imported by main.py, from python -X importtime. Exits
+with status 1 if the window takes longer than the budget or if one of the
+heavy libraries that should only load when a fetch or run starts is
+imported at startup.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Libraries that must not be imported before the first window
+HEAVY_MODULES = ('deepl', 'bs4', 'lxml', 'requests', 'xlsxwriter')
+
+
+def parse_importtime(stderr):
+    """Parse python -X importtime output into [(module, self_us, cumulative_us, depth)]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(parts[0]), int(parts[1]), depth))
+    return modules
+
+
+def measure_imports():
+    """Import main in a fresh interpreter and get the import times of main and the modules it imports"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=APP_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import main failed: {result.stderr.strip().splitlines()[-1]}")
+    modules = parse_importtime(result.stderr)
+    # Modules are listed after the ones they import, so main's imports are
+    # the entries between the previous top-level module and main itself
+    end = next(i for i, module in enumerate(modules) if module[0] == 'main' and module[3] == 0)
+    start = end
+    while start > 0 and modules[start - 1][3] > 0:
+        start -= 1
+    return modules[start:end + 1]
+
+
+def measure_first_window():
+    """Start the app in a fresh interpreter and time until its window is mapped"""
+    env = dict(os.environ, DEEPL_API_KEY=os.environ.get('DEEPL_API_KEY') or 'startup-budget')
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--child'],
+        cwd=APP_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    _, stderr = process.communicate()
+    if line.strip() != 'window':
+        error = stderr.strip().splitlines()
+        raise RuntimeError(f"the app didn't show a window: {error[-1] if error else 'no output'}")
+    return elapsed
+
+
+def run_child():
+    """Show the app's window, report it on stdout and quit"""
+    import tkinter as tk
+    import main
+
+    root = tk.Tk()
+
+    def mapped(event):
+        if event.widget is root:
+            print('window', flush=True)
+            root.after(0, root.destroy)
+
+    root.bind('<Map>', mapped)
+    main.TranslationApp(root)
+    root.mainloop()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check GUI startup time and startup imports against a budget")
+    parser.add_argument('--budget', type=float, default=1.5, help="seconds allowed until the first window (default 1.5)")
+    parser.add_argument('--runs', type=int, default=3, help="app starts to take the median of (default 3)")
+    parser.add_argument('--top', type=int, default=15, help="slowest modules to list (default 15)")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return run_child()
+
+    failed = False
+    try:
+        modules = measure_imports()
+    except RuntimeError as e:
+        print(f"FAIL: {e}")
+        return 1
+    print(f"import main: {modules[-1][2] / 1000:.1f} ms")
+    print(f"{'module':<40}{'self ms':>10}{'cumulative ms':>15}")
+    for name, own, cumulative, depth in sorted(modules, key=lambda module: -module[2])[:args.top]:
+        print(f"{'  ' * depth + name:<40}{own / 1000:>10.1f}{cumulative / 1000:>15.1f}")
+
+    heavy = sorted({name.split('.')[0] for name, _, _, _ in modules} & set(HEAVY_MODULES))
+    if heavy:
+        failed = True
+        print(f"FAIL: imported at startup: {', '.join(heavy)}")
+
+    try:
+        times = [measure_first_window() for _ in range(max(1, args.runs))]
+    except RuntimeError as e:
+        # No display (e.g. a headless CI box): only the import checks apply
+        print(f"Skipping time to first window: {e}")
+    else:
+        median = statistics.median(times)
+        print(f"time to first window: {median:.2f} s (median of {len(times)}, budget {args.budget:.2f} s)")
+        if median > args.budget:
+            failed = True
+            print("FAIL: over the startup budget")
+
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Per-stage timing spans and counters, exported as a Chrome trace
+
+Tracing is off unless the trace_runs setting is on. While no trace is
+active, span() returns a shared no-op context manager and count() returns
+straight away, so the instrumentation left in the code costs next to
+nothing.
+
+The trace file uses the Chrome trace-event format: open it in
+chrome://tracing or https://ui.perfetto.dev to see every URL's fetch,
+extract, translate and write spans per thread.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+# Traces currently recording (the CLI can run several sites at once; each
+# trace then also sees the other sites' spans)
+_active = []
+_active_lock = threading.Lock()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('traces', 'name', 'args', 'start')
+
+    def __init__(self, traces, name, args):
+        self.traces = traces
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        thread = threading.current_thread()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        for trace in self.traces:
+            trace.add(self.name, self.start, end, thread, self.args)
+        return False
+
+
+class Trace:
+    """Timing spans and counters recorded during one run"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter_ns()
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._events = []
+        self._threads = {}
+        self._counters = {}
+
+    def add(self, name, start, end, thread, args):
+        """Record a finished span"""
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append((name, start, end, thread.ident, args))
+
+    def count(self, name, value):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def to_chrome(self):
+        """Build the Chrome trace-event JSON object"""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                for tid, name in self._threads.items()
+            ]
+            for name, start, end, tid, args in self._events:
+                events.append({
+                    'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                    'ts': (start - self.started) / 1000, 'dur': (end - start) / 1000, 'args': args,
+                })
+            counters = dict(self._counters)
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'run': self.name, 'started': self.started_at, 'counters': counters},
+        }
+
+    def summary(self):
+        """Format a table of time per span name (busiest first) and the counters"""
+        wall = (time.perf_counter_ns() - self.started) / 1e9
+        stages = {}
+        with self._lock:
+            for name, start, end, tid, args in self._events:
+                stage = stages.setdefault(name, [0, 0, 0])
+                duration = end - start
+                stage[0] += 1
+                stage[1] += duration
+                stage[2] = max(stage[2], duration)
+            counters = dict(self._counters)
+
+        lines = [
+            f"Run trace for {self.name}: {wall:.2f}s wall time (stages overlap, so totals can exceed it)",
+            f"{'stage':<24}{'count':>8}{'total s':>11}{'mean ms':>11}{'max ms':>11}",
+        ]
+        for name, (calls, total, longest) in sorted(stages.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<24}{calls:>8}{total / 1e9:>11.2f}{total / calls / 1e6:>11.1f}{longest / 1e6:>11.1f}")
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name:<24}{value:>8}")
+        return "\n".join(lines)
+
+    def save(self, path):
+        """Write the Chrome trace JSON to path"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f)
+
+
+def span(name, **args):
+    """Time a block as one span: with span('fetch', url=url): ..."""
+    traces = _active
+    if not traces:
+        return _NULL_SPAN
+    return _Span(list(traces), name, args)
+
+
+def count(name, value=1):
+    """Add to a run counter (bytes downloaded, characters sent, cache hits, ...)"""
+    if not _active:
+        return
+    for trace in list(_active):
+        trace.count(name, value)
+
+
+def start_trace(name):
+    """Start recording a trace for a run"""
+    trace = Trace(name)
+    with _active_lock:
+        _active.append(trace)
+    return trace
+
+
+def stop_trace(trace):
+    """Stop recording a trace started with start_trace()"""
+    with _active_lock:
+        if trace in _active:
+            _active.remove(trace)
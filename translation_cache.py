@@ -0,0 +1,265 @@
+"""Persistent translation cache (in-memory LRU in front of an SQLite store)"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from config import get_config_dir, get_setting
+from translation_memory import (
+    make_template, make_template_key, fill_template, change_trailing, split_trailing, trailing_variants,
+)
+
+
+# Prune the disk store after this many new entries have been written
+PRUNE_EVERY = 1000
+
+
+def normalize_text(text):
+    """Normalize text for cache lookups (Unicode NFC, collapsed whitespace)"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def make_cache_key(source_language, target_language, text):
+    """Build the cache key: a hash of source language, target language and normalized text"""
+    raw = f"{(source_language or '').upper()}\x1f{target_language.upper()}\x1f{normalize_text(text)}"
+    return hashlib.sha256(raw.encode('utf-8')).digest()
+
+
+def get_cache_path():
+    """Get the path to the on-disk translation cache"""
+    return get_config_dir() / "translation_cache.sqlite3"
+
+
+class TranslationCache:
+    """Bounded in-memory LRU backed by an SQLite store shared across runs
+
+    Safe to use from several worker threads at once. Entries older than
+    max_age_days are dropped, and the disk store is trimmed to
+    max_disk_entries by least recent use. use_memory (default: the
+    translation_memory setting) turns on get_similar_many() lookups.
+    """
+
+    def __init__(self, path=None, max_memory_entries=None, max_disk_entries=None, max_age_days=None, use_memory=None):
+        self.use_memory = get_setting('translation_memory') if use_memory is None else use_memory
+        self.max_memory_entries = max_memory_entries or get_setting('translation_cache_memory_entries')
+        self.max_disk_entries = max_disk_entries or get_setting('translation_cache_max_entries')
+        self.max_age_days = max_age_days or get_setting('translation_cache_max_age_days')
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.similar_hits = 0
+
+        self._db = None
+        try:
+            self._db = sqlite3.connect(str(path or get_cache_path()), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key BLOB PRIMARY KEY, translation TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+            # Translation memory: the latest translation of each placeholder template
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS templates ("
+                "key BLOB PRIMARY KEY, source TEXT NOT NULL, translation TEXT NOT NULL, "
+                "created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS templates_last_used ON templates (last_used)")
+            self._db.commit()
+            self.prune()
+        except sqlite3.Error as e:
+            # Fall back to a memory-only cache if the store can't be opened
+            print(f"Translation cache unavailable, using memory only: {e}")
+            self._db = None
+
+    def _select_locked(self, table, columns, keys):
+        """Fetch {key: value} for unexpired keys in a table and mark them used (lock must be held)"""
+        min_created = time.time() - self.max_age_days * 86400
+        rows = {}
+        # Stay well under SQLite's bound parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            for row in self._db.execute(
+                f"SELECT key, {columns} FROM {table} WHERE created >= ? AND key IN ({placeholders})",
+                [min_created] + chunk,
+            ):
+                rows[row[0]] = row[1] if len(row) == 2 else row[1:]
+        if rows:
+            self._db.executemany(
+                f"UPDATE {table} SET last_used = ? WHERE key = ?",
+                [(time.time(), key) for key in rows],
+            )
+            self._db.commit()
+        return rows
+
+    def _remember(self, key, translation):
+        """Add an entry to the in-memory LRU (lock must be held)"""
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, source_language, target_language, texts):
+        """Look up several texts, returning {text: translation} for the ones that are cached"""
+        found = {}
+        keys = {}
+        with self._lock:
+            for text in texts:
+                if text in found or text in keys:
+                    continue
+                key = make_cache_key(source_language, target_language, text)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[text] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    keys[text] = key
+
+            if keys and self._db is not None:
+                rows = self._select_locked('translations', 'translation', list(keys.values()))
+                for text, key in keys.items():
+                    if key in rows:
+                        found[text] = rows[key]
+                        self._remember(key, rows[key])
+                        self.disk_hits += 1
+
+            self.misses += sum(1 for text in keys if text not in found)
+        return found
+
+    def get_similar_many(self, source_language, target_language, texts):
+        """Rebuild translations of uncached texts from the translation memory
+
+        Texts that differ from a stored one only in numbers, URLs, email
+        addresses or a trailing '.'/':' get the stored translation with those
+        swapped in (see translation_memory). Returns {text: translation}.
+        """
+        found = {}
+        with self._lock:
+            templated = {}
+            variants = {}
+            for text in texts:
+                normalized = normalize_text(text)
+                template, values, _ = make_template(normalized)
+                if values:
+                    templated[text] = (normalized, make_template_key(source_language, target_language, template))
+                else:
+                    for variant in trailing_variants(normalized):
+                        variants.setdefault(text, []).append(
+                            (variant, make_cache_key(source_language, target_language, variant))
+                        )
+
+            if templated and self._db is not None:
+                rows = self._select_locked('templates', 'source, translation', [key for _, key in templated.values()])
+                for text, (normalized, key) in templated.items():
+                    if key in rows:
+                        stored_source, stored_translation = rows[key]
+                        translation = fill_template(stored_source, stored_translation, normalized)
+                        if translation is not None:
+                            found[text] = translation
+
+            if variants:
+                keys = [key for options in variants.values() for _, key in options]
+                rows = {key: self._memory[key] for key in keys if key in self._memory}
+                if self._db is not None:
+                    rows.update(self._select_locked('translations', 'translation', [key for key in keys if key not in rows]))
+                for text, options in variants.items():
+                    _, trailing = split_trailing(normalize_text(text))
+                    for variant, key in options:
+                        if key in rows:
+                            translation = change_trailing(rows[key], split_trailing(variant)[1], trailing)
+                            if translation is not None:
+                                found[text] = translation
+                                break
+
+            self.similar_hits += len(found)
+        return found
+
+    def get(self, source_language, target_language, text):
+        """Look up a single text, returning None if it is not cached"""
+        return self.get_many(source_language, target_language, [text]).get(text)
+
+    def set_many(self, source_language, target_language, translations):
+        """Store {text: translation} pairs in memory and on disk"""
+        now = time.time()
+        with self._lock:
+            rows = []
+            templates = []
+            for text, translation in translations.items():
+                key = make_cache_key(source_language, target_language, text)
+                self._remember(key, translation)
+                rows.append((key, translation, now, now))
+                normalized = normalize_text(text)
+                template, values, _ = make_template(normalized)
+                if values:
+                    template_key = make_template_key(source_language, target_language, template)
+                    templates.append((template_key, normalized, translation, now, now))
+            if rows and self._db is not None:
+                self._db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", rows)
+                self._db.executemany("INSERT OR REPLACE INTO templates VALUES (?, ?, ?, ?, ?)", templates)
+                self._db.commit()
+                self._writes_since_prune += len(rows)
+                if self._writes_since_prune >= PRUNE_EVERY:
+                    self._prune_locked()
+
+    def set(self, source_language, target_language, text, translation):
+        """Store a single translation"""
+        self.set_many(source_language, target_language, {text: translation})
+
+    def _prune_locked(self):
+        """Drop expired entries and trim the disk store to its size limit (lock must be held)"""
+        self._writes_since_prune = 0
+        if self._db is None:
+            return
+        for table in ('translations', 'templates'):
+            self._db.execute(f"DELETE FROM {table} WHERE created < ?", (time.time() - self.max_age_days * 86400,))
+            self._db.execute(
+                f"DELETE FROM {table} WHERE key IN ("
+                f"SELECT key FROM {table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+        self._db.commit()
+
+    def prune(self):
+        """Apply the age and size limits to the disk store"""
+        with self._lock:
+            self._prune_locked()
+
+    def stats(self):
+        """Return hit/miss counters and current sizes"""
+        with self._lock:
+            disk_entries = 0
+            if self._db is not None:
+                disk_entries = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'similar_hits': self.similar_hits,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+            }
+
+    def clear(self):
+        """Remove every cached translation from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM translations")
+                self._db.execute("DELETE FROM templates")
+                self._db.commit()
+
+    def close(self):
+        """Close the disk store"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,119 @@
+"""Translation memory: reuse a stored translation when only placeholders differ
+
+Segments like "Call us at 555-0100" and "Call us at 555-0199", or
+"See https://example.com/a" and "See https://example.com/b", share a
+template with the numbers, URLs and email addresses taken out. When a
+segment misses the cache but a segment with the same template was
+translated before, the new translation is rebuilt from the stored one by
+swapping the placeholder values, without calling DeepL.
+
+This is only done when it is safe: every stored value must appear exactly
+once, unchanged, in the stored translation (so DeepL didn't reformat or
+reorder it), and plain counts followed by a word ("2 products") are not
+treated as placeholders, since the words around them inflect with the
+number in many languages. A trailing period or colon is also allowed to
+differ, for translations in scripts that use the same punctuation.
+"""
+
+import hashlib
+import re
+
+
+PLACEHOLDER_PATTERN = re.compile(
+    r'(?:https?://|www\.)[^\s<>"]*[^\s<>".,;:!?)\]]'  # URLs
+    r'|[\w.+-]+@[\w-]+(?:\.[\w-]+)+'  # email addresses
+    r'|(?<![\w])\d(?:[\d.,:/\-]*\d)?(?![\w])'  # numbers, dates, phone numbers
+)
+# A plain integer followed by a word is a count, not a placeholder
+COUNT_FOLLOWS = re.compile(r'\s+[^\W\d_]')
+TRAILING_PUNCTUATION = ('.', ':')
+# Latin, Greek and Cyrillic scripts end sentences with the same '.' and ':'
+MAX_SAME_PUNCTUATION_CHAR = 0x052F
+
+
+def split_trailing(text):
+    """Split a trailing '.' or ':' (not an ellipsis) off text"""
+    if text.endswith(TRAILING_PUNCTUATION) and not text.endswith('..'):
+        return text[:-1], text[-1]
+    return text, ''
+
+
+def make_template(text):
+    """Split normalized text into (template, values, trailing punctuation)
+
+    The template has every placeholder replaced by a marker and a trailing
+    '.' or ':' removed. Texts are expected to be normalized already (see
+    translation_cache.normalize_text).
+    """
+    text, trailing = split_trailing(text)
+    values = []
+    parts = []
+    position = 0
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        value = match.group()
+        if value.isdigit() and COUNT_FOLLOWS.match(text, match.end()):
+            continue
+        parts.append(text[position:match.start()])
+        parts.append('\x00')
+        values.append(value)
+        position = match.end()
+    parts.append(text[position:])
+    return ''.join(parts), values, trailing
+
+
+def make_template_key(source_language, target_language, template):
+    """Build the lookup key for a template"""
+    raw = f"{(source_language or '').upper()}\x1f{target_language.upper()}\x1f{template}"
+    return hashlib.sha256(raw.encode('utf-8')).digest()
+
+
+def change_trailing(translation, old, new):
+    """Swap a trailing '.'/':' (or its absence) in a translation, or return None if that isn't safe"""
+    if old == new:
+        return translation
+    if old:
+        if not translation.endswith(old):
+            return None
+        translation = translation[:-1]
+    if not translation or ord(translation[-1]) > MAX_SAME_PUNCTUATION_CHAR:
+        return None
+    return translation + new
+
+
+def fill_template(stored_source, stored_translation, text):
+    """Rebuild the translation of text from a stored translation with the same template
+
+    Both source texts are normalized. Returns None when the values can't
+    be swapped safely.
+    """
+    template, values, trailing = make_template(text)
+    stored_template, stored_values, stored_trailing = make_template(stored_source)
+    if template != stored_template or len(set(stored_values)) != len(stored_values):
+        return None
+
+    # Find each stored value exactly once in the stored translation
+    positions = []
+    for old, new in zip(stored_values, values):
+        start = stored_translation.find(old)
+        if start < 0 or stored_translation.find(old, start + 1) >= 0:
+            return None
+        positions.append((start, start + len(old), new))
+    positions.sort()
+    parts = []
+    position = 0
+    for start, end, new in positions:
+        if start < position:
+            return None  # overlapping values
+        parts.append(stored_translation[position:start])
+        parts.append(new)
+        position = end
+    parts.append(stored_translation[position:])
+    return change_trailing(''.join(parts), stored_trailing, trailing)
+
+
+def trailing_variants(text):
+    """Get normalized text with its trailing '.'/':' swapped for the other options (none, '.', ':')"""
+    base, _ = split_trailing(text)
+    if not base:
+        return []
+    return [variant for variant in (base, base + '.', base + ':') if variant != text]
@@ -1,42 +1,222 @@
 """Translation functionality with caching"""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import deepl
+import deepl.http_client
 from api_key import get_deepl_key
+from config import get_setting
+from rate_limiter import DeepLLimiter
+from tracing import span, count
+from translation_cache import TranslationCache, normalize_text
+from translation_memory import make_template
 
 
-# Translation cache (in-memory, session-only)
-_translation_cache = {}
+# Translation cache (in-memory LRU in front of an on-disk store, shared across runs)
+_translation_cache = None
+_cache_lock = threading.Lock()
 
 # DeepL translator instance
 _translator = None
 
+# Threads translating the target languages of a page side by side
+_language_pool = None
+_language_pool_lock = threading.Lock()
+
+# Rate limiter shared by every DeepL request in this process
+_limiter = None
+_limiter_lock = threading.Lock()
+
+# DeepL accepts at most 50 texts and 128 KiB of request body per call;
+# stay a little under the byte limit to leave room for the other form fields
+MAX_BATCH_SEGMENTS = 50
+MAX_BATCH_BYTES = 120 * 1024
+
 
 def get_translator():
     """Get or create the DeepL translator instance"""
     global _translator
     if _translator is None:
-        _translator = deepl.Translator(get_deepl_key())
+        # DeepLLimiter does the retrying, so it sees every 429
+        deepl.http_client.max_network_retries = 0
+        # deepl_server_url points the client at a DeepL-compatible endpoint
+        # (a proxy, or the fake server in benchmark.py)
+        _translator = deepl.Translator(get_deepl_key(), server_url=get_setting('deepl_server_url'))
     return _translator
 
 
-def translate_text(text, target_language):
+def get_limiter():
+    """Get or create the shared DeepL rate limiter"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = DeepLLimiter()
+        return _limiter
+
+
+def get_limiter_stats():
+    """Get request/throttling counters for DeepL requests"""
+    return get_limiter().stats()
+
+
+def check_quota():
+    """Check the DeepL character quota before a run, raising QuotaExceededException if it is used up"""
+    remaining = get_limiter().check_quota(get_translator())
+    if remaining is not None and remaining <= 0:
+        raise deepl.QuotaExceededException("DeepL character quota for this billing period is used up")
+    return remaining
+
+
+def get_translation_cache():
+    """Get or create the shared translation cache"""
+    global _translation_cache
+    with _cache_lock:
+        if _translation_cache is None:
+            _translation_cache = TranslationCache()
+        return _translation_cache
+
+
+def get_cache_stats():
+    """Get hit/miss counters for the translation cache"""
+    return get_translation_cache().stats()
+
+
+def translate_text(text, target_language, source_language=None):
     """Translate text using DeepL API with caching"""
-    # Create cache key with target language to handle multiple target languages
-    cache_key = f"{target_language}|{text}"
-    
+    cache = get_translation_cache()
+
     # Check cache first
-    if cache_key in _translation_cache:
-        return _translation_cache[cache_key]
+    cached = cache.get(source_language, target_language, text)
+    if cached is not None:
+        count('cache_hits')
+        return cached
+    count('cache_misses')
     
     # If not in cache, translate and store
-    translation = get_translator().translate_text(text, target_lang=target_language)
+    translator = get_translator()
+    with span('deepl.request', language=target_language, segments=1):
+        translation = get_limiter().call(
+            translator, lambda: translator.translate_text(text, target_lang=target_language), len(text)
+        )
+    count('deepl_requests')
+    count('deepl_characters', len(text))
     translated_text = translation.text
-    _translation_cache[cache_key] = translated_text
+    cache.set(source_language, target_language, text, translated_text)
     return translated_text
 
 
+def chunk_segments(texts, max_segments=MAX_BATCH_SEGMENTS, max_bytes=MAX_BATCH_BYTES):
+    """Split texts into chunks that respect DeepL's per-request segment and size limits"""
+    chunk = []
+    chunk_bytes = 0
+    for text in texts:
+        text_bytes = len(text.encode('utf-8'))
+        if chunk and (len(chunk) >= max_segments or chunk_bytes + text_bytes > max_bytes):
+            yield chunk
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(text)
+        chunk_bytes += text_bytes
+    if chunk:
+        yield chunk
+
+
+def _send_batch(texts, target_language, source_language, cache, translated):
+    """Send texts to DeepL in chunks, storing the results in the cache and in translated"""
+    translator = get_translator()
+    for chunk in chunk_segments(texts):
+        characters = sum(len(text) for text in chunk)
+        with span('deepl.request', language=target_language, segments=len(chunk)):
+            results = get_limiter().call(
+                translator, lambda: translator.translate_text(chunk, target_lang=target_language), characters
+            )
+        count('deepl_requests')
+        count('deepl_characters', characters)
+        chunk_translations = {text: result.text for text, result in zip(chunk, results)}
+        cache.set_many(source_language, target_language, chunk_translations)
+        translated.update(chunk_translations)
+
+
+def translate_batch(texts, target_language, source_language=None):
+    """Translate a list of texts, sending only uncached unique texts to DeepL in chunks
+
+    Texts that only differ from a translated one in numbers, URLs, email
+    addresses or trailing punctuation are filled in from the translation
+    memory instead (see translation_memory). Returns the translations in
+    the same order as texts.
+    """
+    cache = get_translation_cache()
+    unique = list(dict.fromkeys(text for text in texts if text))
+    translated = cache.get_many(source_language, target_language, unique)
+    pending = [text for text in unique if text not in translated]
+    count('cache_hits', len(translated))
+    count('cache_misses', len(pending))
+
+    if pending and cache.use_memory:
+        similar = cache.get_similar_many(source_language, target_language, pending)
+        # Only the first text of each template goes to DeepL; the rest can
+        # usually be filled in from its translation afterwards
+        first = {}
+        later = []
+        for text in pending:
+            if text in similar:
+                continue
+            template = make_template(normalize_text(text))[0]
+            if template in first:
+                later.append(text)
+            else:
+                first[template] = text
+        _send_batch(list(first.values()), target_language, source_language, cache, translated)
+        if later:
+            similar.update(cache.get_similar_many(source_language, target_language, later))
+            pending = [text for text in later if text not in similar]
+        else:
+            pending = []
+        count('memory_hits', len(similar))
+        if similar:
+            cache.set_many(source_language, target_language, similar)
+            translated.update(similar)
+
+    if pending:
+        _send_batch(pending, target_language, source_language, cache, translated)
+
+    return [translated[text] if text else text for text in texts]
+
+
+def get_language_pool():
+    """Get or create the thread pool used to translate several languages at once"""
+    global _language_pool
+    with _language_pool_lock:
+        if _language_pool is None:
+            _language_pool = ThreadPoolExecutor(
+                max_workers=max(1, int(get_setting('language_workers'))), thread_name_prefix='language'
+            )
+        return _language_pool
+
+
+def translate_languages(texts, target_languages, source_language=None):
+    """Translate texts into every target language concurrently, one in-flight batch per language
+
+    Returns {language: translations in the same order as texts}. Adding
+    languages adds little wall-clock time; DeepLLimiter still caps the
+    number of requests in flight.
+    """
+    languages = list(dict.fromkeys(target_languages))
+    if len(languages) <= 1:
+        return {language: translate_batch(texts, language, source_language) for language in languages}
+    pool = get_language_pool()
+    futures = {language: pool.submit(translate_batch, texts, language, source_language) for language in languages}
+    try:
+        return {language: future.result() for language, future in futures.items()}
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+
 def clear_translator():
     """Clear the translator instance (useful when API key changes)"""
-    global _translator
+    global _translator, _limiter
     _translator = None
-
+    # Quota and throttling state belong to the old key
+    with _limiter_lock:
+        _limiter = None
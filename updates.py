@@ -1,8 +1,6 @@
 """Update checking functionality"""
 
 import threading
-import requests
-import webbrowser
 from tkinter import messagebox
 from constants import VERSION, GITHUB_REPO_OWNER, GITHUB_REPO_NAME, GITHUB_RELEASES_URL
 
@@ -34,6 +32,9 @@ def check_for_updates(callback=None):
     """Check for updates from GitHub Releases API (non-blocking)"""
     def check():
         try:
+            # Imported here so requests isn't loaded on the startup path
+            import requests
+            
             api_url = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/releases/latest"
             response = requests.get(api_url, timeout=5)
             
@@ -57,6 +58,7 @@ def check_for_updates(callback=None):
 def show_update_dialog(root, latest_version, download_url):
     """Show update notification dialog"""
     def open_download():
+        import webbrowser
         webbrowser.open(download_url)
     
     message = (
@@ -0,0 +1,213 @@
+"""Scrollable URL list that only draws the rows on screen
+
+A tk.Listbox creates an item per URL, which gets slow to fill and to
+scroll with tens of thousands of URLs. This list keeps the URLs in plain
+Python lists and draws just the visible rows on a Canvas, so appending a
+chunk of URLs or changing the filter costs little more than a list
+comprehension.
+"""
+
+import re
+import tkinter as tk
+from tkinter import ttk, font as tkfont
+
+
+class URLList(ttk.Frame):
+    """Multi-select list of SitemapURL with substring/regex filtering
+
+    Clicking a row toggles it, Shift+click selects the range from the last
+    clicked row. select_shown() and select_none_shown() act on the URLs that
+    match the current filter.
+    """
+
+    def __init__(self, master, height=12, on_change=None):
+        super().__init__(master)
+        self.on_change = on_change
+        self.urls = []
+        self._keys = []  # lowercased addresses for substring matching
+        self._addresses = set()
+        self.shown = []  # indexes into urls that match the filter
+        self.selected = set()  # indexes into urls
+        self._match = None
+        self._top = 0  # first shown row at the top of the view
+        self._anchor = None
+        self._redraw_pending = False
+
+        self._font = tkfont.nametofont('TkDefaultFont')
+        self.row_height = self._font.metrics('linespace') + 4
+        self.canvas = tk.Canvas(self, height=height * self.row_height, background='white',
+                                highlightthickness=1, highlightbackground='#a0a0a0', takefocus=1)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.canvas.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.canvas.bind('<Configure>', lambda event: self.redraw())
+        self.canvas.bind('<Button-1>', self._on_click)
+        self.canvas.bind('<Shift-Button-1>', self._on_shift_click)
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+        self.canvas.bind('<Button-4>', lambda event: self.yview('scroll', -3, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.yview('scroll', 3, 'units'))
+        self.canvas.bind('<Up>', lambda event: self.yview('scroll', -1, 'units'))
+        self.canvas.bind('<Down>', lambda event: self.yview('scroll', 1, 'units'))
+        self.canvas.bind('<Prior>', lambda event: self.yview('scroll', -1, 'pages'))
+        self.canvas.bind('<Next>', lambda event: self.yview('scroll', 1, 'pages'))
+
+    def _visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def append(self, urls):
+        """Add URLs to the end of the list, skipping addresses already in it"""
+        start = len(self.urls)
+        for url in urls:
+            if url.address not in self._addresses:
+                self._addresses.add(url.address)
+                self.urls.append(url)
+                self._keys.append(url.address.lower())
+        new = range(start, len(self.urls))
+        if self._match is None:
+            self.shown.extend(new)
+        else:
+            self.shown.extend(i for i in new if self._match(self.urls[i].address, self._keys[i]))
+        self._changed()
+
+    def clear(self):
+        """Remove every URL"""
+        self.urls = []
+        self._keys = []
+        self._addresses = set()
+        self.shown = []
+        self.selected = set()
+        self._top = 0
+        self._anchor = None
+        self._changed()
+
+    def set_filter(self, text, regex=False):
+        """Show only the URLs containing text (or matching it as a regular expression)
+
+        Returns False, leaving the filter unchanged, if text isn't a valid
+        regular expression.
+        """
+        text = text.strip()
+        if not text:
+            match = None
+        elif regex:
+            try:
+                pattern = re.compile(text, re.IGNORECASE)
+            except re.error:
+                return False
+
+            def match(address, key):
+                return pattern.search(address) is not None
+        else:
+            needle = text.lower()
+
+            def match(address, key):
+                return needle in key
+        self._match = match
+        if match is None:
+            self.shown = list(range(len(self.urls)))
+        else:
+            self.shown = [i for i, url in enumerate(self.urls) if match(url.address, self._keys[i])]
+        self._top = 0
+        self._anchor = None
+        self._changed()
+        return True
+
+    def select_shown(self):
+        """Select every URL matching the filter"""
+        self.selected.update(self.shown)
+        self._changed()
+
+    def select_none_shown(self):
+        """Deselect every URL matching the filter"""
+        self.selected.difference_update(self.shown)
+        self._changed()
+
+    def get_selected(self):
+        """Get the selected SitemapURLs in list order"""
+        return [self.urls[i] for i in sorted(self.selected)]
+
+    def _changed(self):
+        self.redraw()
+        if self.on_change:
+            self.on_change()
+
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'/'pages')"""
+        rows = self._visible_rows()
+        if args and args[0] == 'moveto':
+            top = int(float(args[1]) * len(self.shown) + 0.5)
+        elif args and args[0] == 'scroll':
+            step = rows if args[2] == 'pages' else 1
+            top = self._top + int(args[1]) * step
+        else:
+            return
+        self._top = max(0, min(top, len(self.shown) - rows))
+        self.redraw()
+
+    def redraw(self):
+        """Redraw the visible rows (coalesced into one redraw per idle loop)"""
+        if not self._redraw_pending:
+            self._redraw_pending = True
+            self.after_idle(self._draw)
+
+    def _draw(self):
+        self._redraw_pending = False
+        canvas = self.canvas
+        canvas.delete('all')
+        width = canvas.winfo_width()
+        rows = self._visible_rows()
+        total = len(self.shown)
+        self._top = max(0, min(self._top, total - rows))
+        number_width = len(str(len(self.urls))) + 2
+        for row, index in enumerate(self.shown[self._top:self._top + rows + 1]):
+            y = row * self.row_height
+            selected = index in self.selected
+            if selected:
+                canvas.create_rectangle(0, y, width, y + self.row_height, fill='#3875d7', width=0)
+            canvas.create_text(
+                4, y + self.row_height // 2, anchor=tk.W, font=self._font,
+                text=f"{index + 1}.".ljust(number_width) + self.urls[index].address,
+                fill='white' if selected else 'black',
+            )
+        if total:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + rows) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _row_at(self, y):
+        position = self._top + int(y // self.row_height)
+        return position if 0 <= position < len(self.shown) else None
+
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        position = self._row_at(event.y)
+        if position is None:
+            return
+        index = self.shown[position]
+        if index in self.selected:
+            self.selected.discard(index)
+        else:
+            self.selected.add(index)
+        self._anchor = position
+        self._changed()
+
+    def _on_shift_click(self, event):
+        position = self._row_at(event.y)
+        if position is None:
+            return
+        if self._anchor is None or self._anchor >= len(self.shown):
+            self._on_click(event)
+            return
+        low, high = sorted((self._anchor, position))
+        self.selected.update(self.shown[low:high + 1])
+        self._changed()
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS a few units
+        if abs(event.delta) >= 120:
+            self.yview('scroll', -(event.delta // 120) * 3, 'units')
+        elif event.delta:
+            self.yview('scroll', -event.delta, 'units')
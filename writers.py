@@ -0,0 +1,567 @@
+"""Output writers: the Excel workbook plus streaming CSV, JSONL and XLIFF 2.0
+
+The document builders turn every page into a page record and hand it to
+each selected writer as soon as it is its turn (pages are written in URL
+order). A record is a JSON-serializable dict:
+
+    {'url': address, 'segments': [[field, text, level, translations], ...]}
+
+field is 'title', 'meta_description' or 'content', level is the heading
+level (1-6 for h1-h6, 0 for anything else), and translations lists
+one translation (or None) per target language, in target language order
+([] for content-only runs). The common strings get a record with url None.
+
+Writers implement begin(), write_common(), write_page(), close() and
+abort(). Apart from the workbook (which xlsxwriter streams to temp files in
+constant_memory mode), every writer writes each page straight to its file,
+so memory stays flat however many pages there are.
+
+Large runs can split the workbook into shards (see ShardedXlsxWriter),
+each assembled in its own worker process.
+"""
+
+import csv
+import json
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+from xml.sax.saxutils import escape, quoteattr
+import xlsxwriter
+from tracing import span
+
+
+# Sheet holding boilerplate segments that repeat across pages
+COMMON_SHEET_NAME = "Common Strings"
+
+# Ways of grouping pages into workbook shards
+SHARD_BY = ('pages', 'path', 'sitemap')
+
+# Excel ignores hyperlinks past this many on one worksheet
+MAX_HYPERLINKS = 65530
+
+# Characters XML 1.0 doesn't allow, even escaped
+INVALID_XML_CHARACTERS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def write_rows(worksheet, rows, bold):
+    """Write (row, values, is_bold) tuples in ascending row order
+
+    Each row is emitted in one go (source plus every language column), which
+    is what xlsxwriter's constant_memory mode needs: once a later row is
+    written, earlier rows are flushed to disk and can't be changed.
+    """
+    for row, values, is_bold in rows:
+        worksheet.write_row(row, 0, values, bold if is_bold else None)
+
+
+def finish_worksheet(worksheet):
+    """Flush a finished worksheet to its temp file and release the file handle
+
+    Without this, constant_memory mode keeps the last row in memory and one
+    open temp file per worksheet until workbook.close(). xlsxwriter reopens
+    the file itself when it assembles the workbook.
+    """
+    if worksheet.constant_memory:
+        worksheet._write_single_row()
+        worksheet._opt_close()
+
+
+def write_table_of_contents(workbook, addresses, has_common_sheet=False):
+    """Write the Table of Contents sheet mapping each URL to its worksheet"""
+    worksheet = workbook.add_worksheet("Table of Contents")
+    row = 0
+    first_sheet = 2
+    if has_common_sheet:
+        worksheet.write_row(row, 0, [COMMON_SHEET_NAME, "Sheet 2"])
+        row += 1
+        first_sheet = 3
+    for index, address in enumerate(addresses):
+        worksheet.write_row(row, 0, [address, f"Sheet {first_sheet + index}"])
+        row += 1
+    finish_worksheet(worksheet)
+
+
+class OutputWriter:
+    """Base class: one output format for one run"""
+
+    extension = None
+
+    def __init__(self, base_path, kind, source_language, target_languages):
+        self.base_path = base_path
+        self.kind = kind
+        self.source_language = source_language
+        self.target_languages = list(target_languages)
+        self.paths = [f"{base_path}.{self.extension}"]
+
+    def begin(self, all_urls, has_common):
+        """Called once before anything else is written"""
+
+    def write_common(self, record, min_pages):
+        """Write the common strings found on at least min_pages pages"""
+
+    def write_page(self, index, record):
+        """Write the record of the page at index in the URL list"""
+
+    def close(self):
+        """Finish the output files"""
+
+    def abort(self):
+        """Release open files after a failed run, leaving what was written"""
+
+
+class XlsxWriter(OutputWriter):
+    """The Excel workbook: a table of contents, then one worksheet per page"""
+
+    extension = 'xlsx'
+
+    def __init__(self, base_path, kind, source_language, target_languages):
+        super().__init__(base_path, kind, source_language, target_languages)
+        self.workbook = xlsxwriter.Workbook(self.paths[0], {'constant_memory': True})
+        self.bold = self.workbook.add_format({'bold': True})
+        self.closing = False
+        self.closed = False
+
+    def language_row(self):
+        if self.kind == 'translation':
+            return [self.source_language] + self.target_languages
+        return [f"Source Language: {self.source_language}"]
+
+    def begin(self, all_urls, has_common):
+        write_table_of_contents(self.workbook, [url.address for url in all_urls], has_common)
+
+    def write_common(self, record, min_pages):
+        rows = [
+            (0, [f"{COMMON_SHEET_NAME} (on {min_pages} or more pages)"], False),
+            (1, self.language_row(), False),
+            (3, ['Content (ordered):'], True),
+        ]
+        for index, (field, text, level, translations) in enumerate(record['segments']):
+            rows.append((index + 4, [text] + translations, level > 0))
+        self.add_sheet(rows, COMMON_SHEET_NAME)
+
+    def write_page(self, index, record):
+        self.add_sheet(self.page_rows(record))
+
+    def page_rows(self, record):
+        if self.kind == 'translation':
+            return self.translation_rows(record)
+        return self.content_only_rows(record)
+
+    def translation_rows(self, record):
+        # Source language and target languages header, then title, meta
+        # description and content in document order, one row at a time
+        rows = [
+            (0, [record['url']], False),
+            (1, self.language_row(), False),
+            (3, ['Title Tag:'], True),
+        ]
+        row = 4
+        segments = record['segments']
+        for field, text, level, translations in segments:
+            if field == 'title':
+                rows.append((row, [text] + translations, False))
+                row += 1
+
+        row += 2
+        rows.append((row, ['Meta Description'], True))
+        row += 1
+        for field, text, level, translations in segments:
+            if field == 'meta_description':
+                rows.append((row, [text] + translations, False))
+
+        row += 2
+        rows.append((row, ['Content (ordered):'], True))
+        row += 1
+        for field, text, level, translations in segments:
+            if field == 'content':
+                # Headings keep their bold formatting in every language column
+                rows.append((row, [text] + translations, level > 0))
+                row += 1
+        return rows
+
+    def content_only_rows(self, record):
+        rows = [
+            (0, [record['url']], False),
+            (1, self.language_row(), False),
+            (3, ['Title Tag:'], True),
+        ]
+        content = []
+        for field, text, level, translations in record['segments']:
+            if field == 'title':
+                rows.append((4, [text], False))
+            elif field == 'meta_description':
+                rows.append((6, ['Meta Description:'], True))
+                rows.append((7, [text], False))
+            else:
+                content.append((text, level > 0))
+        rows.append((9, ['Content (ordered):'], True))
+        for row, (text, is_heading) in enumerate(content, start=10):
+            rows.append((row, [text], is_heading))
+        return rows
+
+    def add_sheet(self, rows, name=None):
+        worksheet = self.workbook.add_worksheet(name)
+        write_rows(worksheet, rows, self.bold)
+        finish_worksheet(worksheet)
+
+    def close(self):
+        self.close_workbook()
+
+    def close_workbook(self):
+        # Nothing is written to the .xlsx file itself until this point
+        self.closing = True
+        with span('workbook.close'):
+            self.workbook.close()
+        self.closed = True
+
+    def abort(self):
+        if self.closed:
+            return
+        # constant_memory keeps each worksheet's rows in a temp file until close()
+        for worksheet in self.workbook.worksheets():
+            if worksheet.row_data_filename:
+                worksheet._opt_close()
+                try:
+                    os.remove(worksheet.row_data_filename)
+                except OSError:
+                    pass
+        # A close() that failed part way leaves a broken workbook behind
+        if self.closing and os.path.exists(self.paths[0]):
+            os.remove(self.paths[0])
+            print(f"Removed unfinished workbook {self.paths[0]}")
+
+
+def shard_key(url, shard_by):
+    """Get the group a URL belongs to: its first path segment or the sitemap that listed it"""
+    if shard_by == 'path':
+        return urlparse(url.address).path.strip('/').split('/')[0]
+    if shard_by == 'sitemap':
+        return getattr(url, 'sitemap', None)
+    return None
+
+
+def plan_shards(all_urls, shard_pages, shard_by='pages'):
+    """Split the URL indexes into shards of at most shard_pages pages
+
+    With shard_by 'pages', shards are runs of consecutive URLs. With 'path'
+    or 'sitemap', URLs sharing a first path segment (or sitemap) are kept in
+    the same shard, and small groups share a shard; only a group larger
+    than shard_pages is split. Returns lists of indexes in URL order.
+    """
+    if shard_by not in SHARD_BY:
+        raise ValueError(f"Unknown shard grouping: {shard_by} (choose from {', '.join(SHARD_BY)})")
+    groups = {}
+    for index, url in enumerate(all_urls):
+        groups.setdefault(shard_key(url, shard_by), []).append(index)
+    shards = []
+    current = []
+    for indexes in groups.values():
+        for start in range(0, len(indexes), shard_pages):
+            chunk = indexes[start:start + shard_pages]
+            if current and len(current) + len(chunk) > shard_pages:
+                shards.append(sorted(current))
+                current = []
+            current.extend(chunk)
+    if current:
+        shards.append(sorted(current))
+    return shards
+
+
+def build_shard(base_path, kind, source_language, target_languages, addresses, records_path):
+    """Assemble one shard workbook from its page records (runs in a worker process)
+
+    The shard has its own table of contents, then one worksheet per page
+    in the order the records were written. Returns the workbook's path.
+    """
+    writer = XlsxWriter(base_path, kind, source_language, target_languages)
+    write_table_of_contents(writer.workbook, addresses)
+    with open(records_path, encoding='utf-8') as f:
+        for line in f:
+            writer.add_sheet(writer.page_rows(json.loads(line)))
+    writer.workbook.close()
+    return writer.paths[0]
+
+
+class ShardedXlsxWriter(XlsxWriter):
+    """Workbook split into shards of at most shard_pages pages, plus an index workbook
+
+    The index workbook (base_path.xlsx) holds the table of contents, with
+    links to each page's worksheet in its shard, and the common strings.
+    Page records are appended to a temp file per shard; as soon as a
+    shard's last page is written, the shard workbook (base_path_partN.xlsx)
+    is assembled in a worker process, so zipping up the shards runs on
+    every core while later pages are still being fetched.
+    """
+
+    def __init__(self, base_path, kind, source_language, target_languages,
+                 shard_pages, shard_by='pages', processes=0):
+        super().__init__(base_path, kind, source_language, target_languages)
+        self.shard_pages = shard_pages
+        self.shard_by = shard_by
+        self.processes = processes or os.cpu_count() or 1
+        self.shards = []
+        self.pool = None
+        self.futures = []
+        self.temp_dir = None
+
+    def begin(self, all_urls, has_common):
+        self.shards = plan_shards(all_urls, self.shard_pages, self.shard_by)
+        width = len(str(len(self.shards)))
+        self.shard_bases = [f"{self.base_path}_part{number:0{width}d}" for number in range(1, len(self.shards) + 1)]
+        self.paths = self.paths[:1] + [f"{base}.{self.extension}" for base in self.shard_bases]
+        self.shard_of = {}
+        for shard, indexes in enumerate(self.shards):
+            for position, index in enumerate(indexes):
+                self.shard_of[index] = (shard, position)
+        self.remaining = [len(indexes) for indexes in self.shards]
+        self.submitted = [False] * len(self.shards)
+        self.addresses = [[all_urls[index].address for index in indexes] for indexes in self.shards]
+        self.temp_dir = tempfile.mkdtemp(prefix='shards-')
+        self.pool = ProcessPoolExecutor(max_workers=min(self.processes, len(self.shards)))
+
+        # Table of contents: each URL with a link to its sheet in its shard
+        worksheet = self.workbook.add_worksheet("Table of Contents")
+        row = 0
+        if has_common:
+            worksheet.write_url(row, 0, f"internal:'{COMMON_SHEET_NAME}'!A1", string=COMMON_SHEET_NAME)
+            worksheet.write_string(row, 1, "Sheet 2")
+            row += 1
+        for index, url in enumerate(all_urls):
+            shard, position = self.shard_of[index]
+            # Sheet 1 of each shard is its own table of contents
+            sheet = position + 2
+            worksheet.write_string(row, 0, url.address)
+            if row < MAX_HYPERLINKS:
+                link = f"external:{os.path.basename(self.paths[shard + 1])}#'Sheet{sheet}'!A1"
+                worksheet.write_url(row, 1, link, string=f"Sheet {sheet}")
+            else:
+                worksheet.write_string(row, 1, f"Sheet {sheet}")
+            worksheet.write_string(row, 2, os.path.basename(self.paths[shard + 1]))
+            row += 1
+        finish_worksheet(worksheet)
+
+    def records_path(self, shard):
+        return os.path.join(self.temp_dir, f"{shard}.jsonl")
+
+    def write_page(self, index, record):
+        shard, position = self.shard_of[index]
+        with open(self.records_path(shard), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n')
+        self.remaining[shard] -= 1
+        if self.remaining[shard] == 0:
+            self.submit(shard)
+
+    def submit(self, shard):
+        """Start assembling a shard workbook in a worker process"""
+        self.submitted[shard] = True
+        records_path = self.records_path(shard)
+        if not os.path.exists(records_path):
+            open(records_path, 'w').close()  # every page of the shard failed
+        self.futures.append(self.pool.submit(
+            build_shard, self.shard_bases[shard], self.kind, self.source_language,
+            self.target_languages, self.addresses[shard], records_path,
+        ))
+
+    def close(self):
+        # Shards with pages that failed never saw their last page
+        for shard, submitted in enumerate(self.submitted):
+            if not submitted:
+                self.submit(shard)
+        self.close_workbook()
+        with span('shards.wait', shards=len(self.shards)):
+            for future in self.futures:
+                future.result()
+        self.pool.shutdown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def abort(self):
+        if self.pool is not None:
+            # Shards not started yet are dropped; the ones being built finish
+            for future in self.futures:
+                future.cancel()
+            self.pool.shutdown(wait=True)
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        super().abort()
+
+
+class CsvWriter(OutputWriter):
+    """One CSV row per segment: url, field, heading level, source text and one column per target language
+
+    The common strings come first, with an empty url and field 'common'.
+    """
+
+    extension = 'csv'
+
+    def begin(self, all_urls, has_common):
+        self.file = open(self.paths[0], 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        # The source column isn't named after its language, which may be a target too
+        self.writer.writerow(['url', 'field', 'level', 'source'] + self.target_languages)
+
+    def write_common(self, record, min_pages):
+        for field, text, level, translations in record['segments']:
+            self.writer.writerow(['', 'common', level, text] + translations)
+
+    def write_page(self, index, record):
+        for field, text, level, translations in record['segments']:
+            self.writer.writerow([record['url'], field, level, text] + translations)
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+class JsonlWriter(OutputWriter):
+    """One JSON object per line: the common strings first, then each page"""
+
+    extension = 'jsonl'
+
+    def begin(self, all_urls, has_common):
+        self.file = open(self.paths[0], 'w', encoding='utf-8')
+
+    def segments(self, record):
+        out = []
+        for field, text, level, translations in record['segments']:
+            segment = {'field': field, 'text': text, 'level': level}
+            if self.kind == 'translation':
+                segment['translations'] = dict(zip(self.target_languages, translations))
+            out.append(segment)
+        return out
+
+    def write_line(self, value):
+        self.file.write(json.dumps(value, ensure_ascii=False))
+        self.file.write('\n')
+
+    def write_common(self, record, min_pages):
+        self.write_line({
+            'common': True, 'min_pages': min_pages, 'source_language': self.source_language,
+            'segments': self.segments(record),
+        })
+
+    def write_page(self, index, record):
+        self.write_line({
+            'url': record['url'], 'source_language': self.source_language, 'segments': self.segments(record),
+        })
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+
+
+def xliff_language(code):
+    """Turn a DeepL language code (EN-US, PT-BR, DE) into a BCP 47 tag (en-US, pt-BR, de)"""
+    language, _, region = code.partition('-')
+    return f"{language.lower()}-{region}" if region else language.lower()
+
+
+def xml_text(text):
+    return escape(INVALID_XML_CHARACTERS.sub('', text))
+
+
+class XliffWriter(OutputWriter):
+    """XLIFF 2.0 for CAT tools: one file per target language, one <file> per page
+
+    Content-only runs get a single file with source text only.
+    """
+
+    extension = 'xlf'
+
+    def __init__(self, base_path, kind, source_language, target_languages):
+        super().__init__(base_path, kind, source_language, target_languages)
+        # XLIFF 2.0 has one target language per document
+        self.columns = [
+            (column, language) for column, language in enumerate(self.target_languages)
+            if language != source_language
+        ] if kind == 'translation' else [(None, None)]
+        self.paths = [
+            f"{base_path}_{language}.{self.extension}" if language else f"{base_path}.{self.extension}"
+            for column, language in self.columns
+        ]
+        self.files = []
+
+    def begin(self, all_urls, has_common):
+        for path, (column, language) in zip(self.paths, self.columns):
+            f = open(path, 'w', encoding='utf-8')
+            self.files.append(f)
+            target = f' trgLang="{xliff_language(language)}"' if language else ''
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write(
+                f'<xliff xmlns="urn:oasis:names:tc:xliff:document:2.0" version="2.0" '
+                f'srcLang="{xliff_language(self.source_language)}"{target}>\n'
+            )
+
+    def write_file(self, file_id, original, record):
+        for f, (column, language) in zip(self.files, self.columns):
+            parts = [f'  <file id="{file_id}" original={quoteattr(original)}>\n']
+            for number, (field, text, level, translations) in enumerate(record['segments'], start=1):
+                if not text:
+                    continue
+                name = f"h{level}" if level else field
+                parts.append(f'    <unit id="u{number}" name="{name}"><segment><source>{xml_text(text)}</source>')
+                translation = translations[column] if column is not None else None
+                if translation:
+                    parts.append(f'<target>{xml_text(translation)}</target>')
+                parts.append('</segment></unit>\n')
+            parts.append('  </file>\n')
+            f.write(''.join(parts))
+
+    def write_common(self, record, min_pages):
+        self.write_file('common', COMMON_SHEET_NAME, record)
+
+    def write_page(self, index, record):
+        self.write_file(f"f{index + 1}", record['url'], record)
+
+    def close(self):
+        for f in self.files:
+            f.write('</xliff>\n')
+            f.close()
+
+    def abort(self):
+        for f in self.files:
+            f.close()
+
+
+WRITERS = {
+    'xlsx': XlsxWriter,
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'xliff': XliffWriter,
+}
+
+
+def open_writers(output_formats, base_path, kind, source_language, target_languages,
+                 shard_pages=0, shard_by='pages', shard_processes=0):
+    """Create a writer for each output format ('xlsx', 'csv', 'jsonl', 'xliff')
+
+    Files are named base_path plus the format's extension (XLIFF adds the
+    target language). With shard_pages, the workbook is split into shards of
+    at most that many pages, grouped by shard_by and assembled in up to
+    shard_processes worker processes (0: one per CPU core). Raises
+    ValueError for an unknown format or shard grouping.
+    """
+    formats = list(dict.fromkeys(output_formats))
+    unknown = [name for name in formats if name not in WRITERS]
+    if unknown or not formats:
+        raise ValueError(f"Unknown output format(s): {', '.join(unknown) or 'none given'} (choose from {', '.join(WRITERS)})")
+    if shard_pages and shard_by not in SHARD_BY:
+        raise ValueError(f"Unknown shard grouping: {shard_by} (choose from {', '.join(SHARD_BY)})")
+    writers = []
+    for name in formats:
+        if name == 'xlsx' and shard_pages:
+            writers.append(ShardedXlsxWriter(
+                base_path, kind, source_language, target_languages, shard_pages, shard_by, shard_processes,
+            ))
+        else:
+            writers.append(WRITERS[name](base_path, kind, source_language, target_languages))
+    return writers